@@ -1,14 +1,20 @@
 import streamlit as st
-import sqlite3
 import os
-import zipfile
-import shutil
 from datetime import datetime
 import hashlib
-from PIL import Image
-import qrcode
-from io import BytesIO
+from urllib.parse import quote
+import qr
+import thumbs
+import jobs
+import blobstore
+import backup
+import chat
+import html
 import time
+import db
+import metrics
+import offline
+from catalog import catalog
 
 # =============================================
 # PAGE CONFIG + CSS MANTAP GILA
@@ -19,55 +25,48 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="auto"
 )
+metrics.begin_request()
+metrics.section("setup")
 
-st.markdown("""
+# Gaya yang diperlukan halaman imbasan QR; selebihnya hanya untuk app penuh.
+DIRECT_CSS = """
 <style>
-    .main {background: #f8fff8;}
-    [data-testid="stSidebar"] {background: linear-gradient(#1B5E20, #2E7D32);}
-    .card {background: white; border-radius: 18px; padding: 20px; box-shadow: 0 10px 30px rgba(0,0,0,0.1); border: 1px solid #c8e6c9; margin: 20px 0;}
-    .card:hover {box-shadow: 0 20px 40px rgba(0,0,0,0.15);}
-    .info-box {background: linear-gradient(135deg, #E8F5E8, #C8E6C9); border-left: 10px solid #4CAF50; border-radius: 15px; padding: 25px; margin: 30px 0;}
     .direct-card {background: linear-gradient(135deg, #E8F5E8, #C8E6C9); border-radius: 25px; padding: 30px; border: 6px solid #4CAF50; margin: 30px 0; text-align: center; box-shadow: 0 15px 40px rgba(0,0,0,0.2);}
     .stButton>button {background: #4CAF50; color: white; font-weight: bold; border-radius: 15px; height: 55px; width: 100%; font-size: 1.1rem;}
-    .stButton>button[kind="secondary"] {background: #d32f2f !important;}
-    .header-bg {background: linear-gradient(rgba(0,0,0,0.7), rgba(0,0,0,0.7)), url('https://images.unsplash.com/photo-1500595046743-ee5a8a800ec2?w=1200'); background-size: cover; background-position: center; border-radius: 30px; padding: 80px 20px; margin: 15px 0 40px 0; box-shadow: 0 30px 70px rgba(0,0,0,0.5);}
-    .stat-box {background: rgba(255,255,255,0.3); padding: 20px; border-radius: 18px; text-align: center; backdrop-filter: blur(8px);}
-    .restore-box {background: #FFEBEE; border: 4px dashed #D32F2F; border-radius: 20px; padding: 30px; margin: 30px 0;}
-    .hubungi-admin-title h3 {color: white !important; font-weight: 900; font-size: 1.4rem; text-shadow: 2px 2px 10px rgba(0,0,0,0.8); text-align: center;}
+    a.fama-dl {display: block; text-align: center; background: #4CAF50; color: white !important; font-weight: bold; border-radius: 15px; padding: 14px; font-size: 1.1rem; text-decoration: none; margin-bottom: 1rem;}
 </style>
-""", unsafe_allow_html=True)
+"""
 
 # =============================================
 # SETUP FOLDER & DATABASE
 # =============================================
-for folder in ["uploads", "thumbnails"]:
-    os.makedirs(folder, exist_ok=True)
+# PDF disimpan bawah static/ supaya dihantar terus oleh server static Streamlit
+# (streaming, Range, ETag/Last-Modified) tanpa dibaca ke dalam memori skrip.
+# Upload baru masuk storan blob (static/blobs); static/pdf dan uploads/ = fail lama.
+STATIC_DIR = "static"
+DATA_FOLDERS = backup.DATA_FOLDERS
 
-DB_NAME = "fama_standards.db"
-CATEGORIES = ["Keratan Bunga", "Sayur-sayuran", "Buah-buahan", "Lain-lain"]
+DB_NAME = db.DB_NAME
+CATEGORIES = db.CATEGORIES
 
 ADMIN_CREDENTIALS = {
     "admin": hashlib.sha256("fama2025".encode()).hexdigest(),
     "pengarah": hashlib.sha256("fama123".encode()).hexdigest()
 }
 
+@st.cache_resource(show_spinner=False)
+def setup():
+    """Sekali setiap proses (bukan setiap rerun): folder data + migrasi skema."""
+    for folder in DATA_FOLDERS:
+        os.makedirs(folder, exist_ok=True)
+    db.ensure_db()
+    backup.sweep_links(0)  # pautan backup dari proses sebelum ini
+    metrics.start_exporter()
+    return db.schema_version()
+
 def init_db():
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("""CREATE TABLE IF NOT EXISTS documents (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, category TEXT,
-            file_name TEXT, file_path TEXT, thumbnail_path TEXT,
-            upload_date TEXT, uploaded_by TEXT)""")
-        c.execute("""CREATE TABLE IF NOT EXISTS chat_messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, sender TEXT, message TEXT,
-            timestamp TEXT, is_admin INTEGER DEFAULT 0)""")
-        c.execute("""CREATE TABLE IF NOT EXISTS site_info (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            welcome_text TEXT, update_info TEXT)""")
-        c.execute("INSERT OR IGNORE INTO site_info (id, welcome_text, update_info) VALUES (1, 'Selamat Datang ke Sistem Rujukan FAMA Standard', 'Semua standard komoditi telah dikemaskini sehingga Februari 2026')")
-        conn.commit()
-        conn.close()
+        setup()
     except Exception as e:
         st.error(f"Database init error: {e}")
 
@@ -76,107 +75,260 @@ init_db()
 # =============================================
 # HELPER FUNCTIONS
 # =============================================
-def save_thumbnail(file):
-    if not file: return None
+def static_url(path):
+    """URL /app/static untuk fail di bawah static/, atau None jika tiada."""
+    if not st.get_option("server.enableStaticServing"):
+        return None
+    rel = os.path.relpath(os.path.abspath(path), os.path.abspath(STATIC_DIR))
+    if rel.startswith(".."):
+        return None
+    return "app/static/" + quote(rel.replace(os.sep, "/"))
+
+def render_thumbnail(doc, sizes="(max-width: 640px) 45vw, 240px", eager=False):
+    """Thumbnail responsif: pelayar pilih saiz & format (WebP/JPEG) terkecil yang muat.
+
+    eager=True untuk imej utama di atas lipatan (halaman QR): muat segera, keutamaan tinggi.
+    """
+    try:
+        variants = thumbs.ensure_variants(doc['thumbnail_path']) or thumbs.placeholder()
+    except Exception:
+        variants = thumbs.placeholder()
+    if static_url(variants[(thumbs.SIZES[0], "jpg")]):
+        load = "loading='eager' fetchpriority='high'" if eager else "loading='lazy'"
+        srcset = lambda ext: ", ".join(f"{static_url(variants[(w, ext)])} {w}w" for w in thumbs.SIZES)
+        st.markdown(f"<picture><source type='image/webp' srcset='{srcset('webp')}' sizes='{sizes}'>"
+                    f"<img src='{static_url(variants[(thumbs.SIZES[1], 'jpg')])}' srcset='{srcset('jpg')}' sizes='{sizes}' "
+                    f"{load} alt='' style='width:100%;border-radius:12px;'></picture>", unsafe_allow_html=True)
+    else:
+        st.image(variants[(thumbs.SIZES[1], "jpg")], use_container_width=True)
+
+def keyset_page(key, filters, count_fn, fetch_fn, per_page, label="standard"):
+    """Pagination keyset dengan butang Sebelumnya/Seterusnya; pulangkan baris halaman semasa.
+
+    Kursor (id terakhir setiap halaman) disimpan dalam session_state[key];
+    penapis berubah -> kembali ke halaman 1.
+    """
+    state = st.session_state.get(key)
+    if not state or state["filters"] != filters:
+        state = st.session_state[key] = {"filters": filters, "page": 1, "cursors": [None]}
+    found = count_fn()
+    total_page = max(1, (found + per_page - 1) // per_page)
+    rows = fetch_fn(state["cursors"][state["page"] - 1], per_page)
+
+    c1, c2, c3 = st.columns([1.5,3,1.5])
+    with c1:
+        if st.button("Sebelumnya", disabled=state["page"] <= 1, key=f"{key}_prev"):
+            state["page"] -= 1
+            st.rerun()
+    with c2:
+        st.markdown(f"<div style='text-align:center;padding:15px;background:#4CAF50;color:white;border-radius:15px;font-weight:bold;'>Halaman {state['page']} / {total_page} • {found} {label}</div>", unsafe_allow_html=True)
+    with c3:
+        if st.button("Seterusnya", disabled=state["page"] >= total_page or not rows, key=f"{key}_next"):
+            state["cursors"] = state["cursors"][:state["page"]] + [rows[-1]['id']]
+            state["page"] += 1
+            st.rerun()
+    return rows
+
+def upload_status():
+    """Status kerja upload sesi ini. Ditinjau setiap 2 saat hanya selagi ada kerja belum selesai."""
+    if any(j.active for j in jobs.list_jobs(st.session_state.get("job_ids", []))):
+        _upload_status_live(True)
+    else:
+        _upload_status(False)
+
+def _upload_status(live):
+    st.markdown("#### Status Pemprosesan")
+    job_list = jobs.list_jobs(st.session_state.get("job_ids", []))
+    for job in reversed(job_list):
+        if job.status == jobs.FAILED:
+            st.error(f"{job.label}: gagal - {job.error}")
+        elif job.status == jobs.DONE and job.report is not None:
+            st.success(f"{job.label}: selesai - " + ", ".join(f"{k} {v}" for k, v in job.result.items()))
+            with st.expander("Laporan setiap fail"):
+                st.dataframe([{"fail": r["file"], "status": r["status"], "ID": str(r.get("id", "")), "tajuk": r["title"],
+                               "ralat": r.get("error", "")} for r in job.report], hide_index=True, use_container_width=True)
+        elif job.status == jobs.DONE:
+            st.success(f"{job.label}: selesai (ID {job.result})")
+        else:
+            st.progress(job.progress, text=f"{job.label}: {job.status} • {job.step}")
+    if st.button("Kosongkan senarai", key="clear_jobs"):
+        st.session_state.job_ids = [j.id for j in jobs.list_jobs(st.session_state.job_ids) if j.active]
+        st.rerun()
+    if live and not any(j.active for j in job_list):
+        st.rerun()  # semua selesai - rerun penuh untuk berhenti meninjau
+
+_upload_status_live = st.fragment(run_every=2)(_upload_status)
+
+@st.fragment(run_every=2)
+def offline_status():
+    """Status eksport luar talian (kerja latar belakang), ditinjau setiap 2 saat."""
+    job = jobs.get(st.session_state.offline_job)
+    if job is None:
+        return
+    if job.status == jobs.FAILED:
+        st.error(f"Gagal eksport: {job.error}")
+    elif job.status == jobs.DONE:
+        st.success(", ".join(f"{k} {v}" for k, v in job.result.items())
+                   + f". Folder di server: {os.path.abspath(offline.OUT_DIR)}")
+    else:
+        st.progress(job.progress, text=f"{job.label}: {job.status} • {job.step}")
+
+def pdf_download(doc, primary=False):
+    """Butang muat turun PDF. Fail hanya dibaca bila pengguna tekan butang."""
+    path = doc['file_path']
+    if not path or not os.path.exists(path):
+        st.warning("Fail PDF tidak dijumpai.")
+        return
+    url = static_url(path)
+    if url:
+        # Blob bernama sha256.pdf; atribut download kekalkan nama fail asal.
+        st.markdown(f"<a class='fama-dl' href='{url}' download='{html.escape(doc['file_name'], quote=True)}' target='_blank'>MUAT TURUN PDF</a>", unsafe_allow_html=True)
+    else:
+        # Fail lama (uploads/) atau static serving dimatikan: jana data secara tertunda.
+        kind = "primary" if primary else "secondary"
+        st.download_button("MUAT TURUN PDF", lambda: blobstore.read_verified(path, doc.get('sha256')), doc['file_name'],
+                           mime="application/pdf", type=kind, use_container_width=True, key=f"dl{doc['id']}")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def static_usage():
+    return blobstore.static_usage(STATIC_DIR)
+
+def search_docs(text=None, category=None, after_id=None, limit=None):
     try:
-        img = Image.open(file).convert("RGB")
-        img.thumbnail((400, 600))
-        path = f"thumbnails/thumb_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jpg"
-        img.save(path, "JPEG", quality=95)
-        return path
+        return db.search_docs(text, category, after_id, limit)
     except Exception as e:
-        st.error(f"Error save thumbnail: {e}")
-        return None
+        st.error(f"Error carian: {e}")
+        return []
+
+def count_docs(text=None, category=None):
+    try:
+        return db.count_docs(text, category)
+    except Exception as e:
+        st.error(f"Error carian: {e}")
+        return 0
 
-def get_docs():
+def search_text(text, category=None, limit=20):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT * FROM documents ORDER BY id DESC")
-        rows = c.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        return db.search_text(text, category, limit)
     except Exception as e:
-        st.error(f"Error get docs: {e}")
+        st.error(f"Error carian kandungan: {e}")
         return []
 
+def snippet_html(snippet):
+    """Snippet FTS -> HTML selamat, padanan diserlahkan dengan <mark>."""
+    return (html.escape(snippet or "").replace(db.SNIP_OPEN, "<mark>").replace(db.SNIP_CLOSE, "</mark>")
+            .replace("\n", " "))
+
 def get_doc_by_id(doc_id):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT * FROM documents WHERE id = ?", (doc_id,))
-        row = c.fetchone()
-        conn.close()
-        return dict(row) if row else None
+        return catalog.lookup(doc_id)
     except Exception as e:
         st.error(f"Error get doc: {e}")
         return None
 
-@st.cache_data(ttl=10)
-def get_chat_messages():
+def chat_delta(key, limit, trim=True):
+    """Mesej chat untuk sesi ini; selepas kali pertama hanya mesej baru (id > kursor) diambil.
+
+    trim=False: senarai sesi tidak dipotong (admin boleh tambah mesej lama di hadapan).
+    """
     try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT * FROM chat_messages ORDER BY timestamp ASC")
-        rows = c.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        state = st.session_state.get(key)
+        new = None
+        if state and state["epoch"] == chat.feed.epoch:
+            # limit+1: jika jurang melebihi had, kursor sudah basi - mula semula dari terkini
+            new = chat.feed.since(state["last_id"], limit + 1)
+        if new is None or len(new) > limit:
+            msgs = chat.feed.recent(limit)
+        else:
+            msgs = state["msgs"] + new
+            if trim:
+                msgs = msgs[-limit:]
+        st.session_state[key] = {"epoch": chat.feed.epoch, "msgs": msgs,
+                                 "last_id": msgs[-1]["id"] if msgs else 0}
+        return msgs
     except:
         return []
 
 def add_chat_message(sender, message, is_admin=False):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.execute("INSERT INTO chat_messages (sender,message,timestamp,is_admin) VALUES (?,?,?,?)",
-                     (sender, message, datetime.now().strftime("%Y-%m-%d %H:%M"), int(is_admin)))
-        conn.commit()
-        conn.close()
-        st.cache_data.clear()
+        chat.feed.add(sender, message, is_admin)
     except Exception as e:
         st.error(f"Error add chat: {e}")
 
 def clear_all_chat():
     try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.execute("DELETE FROM chat_messages")
-        conn.commit()
-        conn.close()
-        st.cache_data.clear()
+        chat.feed.clear()
         st.success("Semua chat dipadam!")
     except Exception as e:
         st.error(f"Error clear chat: {e}")
 
 def get_site_info():
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("SELECT welcome_text, update_info FROM site_info WHERE id = 1")
-        row = c.fetchone()
-        conn.close()
-        return {"welcome": row[0] if row else "Selamat Datang", "update": row[1] if row else ""}
+        return db.get_site_info()
     except:
         return {"welcome": "Selamat Datang", "update": ""}
 
 def update_site_info(welcome, update):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("UPDATE site_info SET welcome_text = ?, update_info = ? WHERE id = 1", (welcome, update))
-        conn.commit()
-        conn.close()
+        db.update_site_info(welcome, update)
         st.success("Maklumat dikemaskini!")
     except Exception as e:
         st.error(f"Error update info: {e}")
 
 # =============================================
-# SIDEBAR + DIRECT QR ACCESS
+# DIRECT QR ACCESS (LALUAN PANTAS)
 # =============================================
-query_params = st.query_params  # Fixed: new Streamlit API
-direct_doc_id = query_params.get("doc", [None])[0]
+# Imbasan QR ialah pintu masuk paling kerap: hanya kad dokumen dirender
+# (CSS kecil, tanpa sidebar, chat atau menu) lalu st.stop(). Metadata dari
+# LRU katalog; PDF dipaut terus ke server static (ETag/Last-Modified, Range)
+# supaya telefon boleh cache dan sambung muat turun.
+direct_doc_id = st.query_params.get("doc")
+st.markdown(DIRECT_CSS, unsafe_allow_html=True)
+
+if direct_doc_id:
+    metrics.section("direct")
+    try:
+        doc = get_doc_by_id(int(direct_doc_id))
+        if doc:
+            st.markdown("<div class='direct-card'><h1>QR CODE BERJAYA!</h1><h2>Standard Dibuka Secara Langsung</h2></div>", unsafe_allow_html=True)
+            c1, c2 = st.columns(2)
+            with c1:
+                render_thumbnail(doc, sizes="(max-width: 640px) 90vw, 400px", eager=True)
+            with c2:
+                st.markdown(f"<h2 style='color:#1B5E20;'>{doc['title']}</h2>", unsafe_allow_html=True)
+                st.write(f"**Kategori:** {doc['category']} • **ID:** {doc['id']}")
+                pdf_download(doc, primary=True)
+        else:
+            st.error("Standard tidak dijumpai.")
+    except ValueError:
+        st.error("ID tidak sah.")
+    except Exception as e:
+        st.error(f"Error direct access: {e}")
+    if st.button("Buka Rujukan FAMA Standard", key="open_full"):
+        st.query_params.clear()
+        st.rerun()
+    metrics.end_request()
+    st.stop()
+
+st.markdown("""
+<style>
+    .main {background: #f8fff8;}
+    [data-testid="stSidebar"] {background: linear-gradient(#1B5E20, #2E7D32);}
+    .card {background: white; border-radius: 18px; padding: 20px; box-shadow: 0 10px 30px rgba(0,0,0,0.1); border: 1px solid #c8e6c9; margin: 20px 0;}
+    .card:hover {box-shadow: 0 20px 40px rgba(0,0,0,0.15);}
+    .info-box {background: linear-gradient(135deg, #E8F5E8, #C8E6C9); border-left: 10px solid #4CAF50; border-radius: 15px; padding: 25px; margin: 30px 0;}
+    .stButton>button[kind="secondary"] {background: #d32f2f !important;}
+    .header-bg {background: linear-gradient(rgba(0,0,0,0.7), rgba(0,0,0,0.7)), url('https://images.unsplash.com/photo-1500595046743-ee5a8a800ec2?w=1200'); background-size: cover; background-position: center; border-radius: 30px; padding: 80px 20px; margin: 15px 0 40px 0; box-shadow: 0 30px 70px rgba(0,0,0,0.5);}
+    .stat-box {background: rgba(255,255,255,0.3); padding: 20px; border-radius: 18px; text-align: center; backdrop-filter: blur(8px);}
+    .restore-box {background: #FFEBEE; border: 4px dashed #D32F2F; border-radius: 20px; padding: 30px; margin: 30px 0;}
+    .hubungi-admin-title h3 {color: white !important; font-weight: 900; font-size: 1.4rem; text-shadow: 2px 2px 10px rgba(0,0,0,0.8); text-align: center;}
+</style>
+""", unsafe_allow_html=True)
 
+# =============================================
+# SIDEBAR
+# =============================================
+metrics.section("sidebar")
 with st.sidebar:
     st.markdown("<div style='text-align:center;padding:20px 0;'><img src='https://upload.wikimedia.org/wikipedia/commons/4/4b/FAMA_logo.png' width=120><h3 style='color:white;margin:10px 0;font-weight:900;'>FAMA STANDARD</h3></div>", unsafe_allow_html=True)
     st.markdown("---")
@@ -184,7 +336,7 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("<div class='hubungi-admin-title'><h3>Hubungi Admin FAMA</h3></div>", unsafe_allow_html=True)
     
-    for msg in get_chat_messages()[-8:]:
+    for msg in chat_delta("chat_sidebar", 8):
         if msg.get('is_admin'):
             st.markdown(f'<div style="background:#E8F5E8;border-radius:12px;padding:12px;margin:8px 0;text-align:right;border-left:6px solid #4CAF50;"><small><b>Admin</b> • {msg["timestamp"][-5:]}</small><br>{msg["message"]}</div>', unsafe_allow_html=True)
         else:
@@ -198,44 +350,11 @@ with st.sidebar:
             st.success("Mesej dihantar!")
             st.rerun()
 
-# =============================================
-# DIRECT QR ACCESS
-# =============================================
-if direct_doc_id and page != "Admin Panel":
-    try:
-        doc = get_doc_by_id(int(direct_doc_id))
-        if doc:
-            st.markdown("<div class='direct-card'><h1>QR CODE BERJAYA!</h1><h2>Standard Dibuka Secara Langsung</h2></div>", unsafe_allow_html=True)
-            c1, c2 = st.columns(2)
-            with c1:
-                img_path = doc['thumbnail_path'] if doc['thumbnail_path'] and os.path.exists(doc['thumbnail_path']) else None
-                if img_path:
-                    st.image(img_path, use_container_width=True)
-                else:
-                    st.image("https://via.placeholder.com/400x600/4CAF50/white?text=FAMA", use_container_width=True)
-            with c2:
-                st.markdown(f"<h2 style='color:#1B5E20;'>{doc['title']}</h2>", unsafe_allow_html=True)
-                st.write(f"**Kategori:** {doc['category']} • **ID:** {doc['id']}")
-                if os.path.exists(doc['file_path']):
-                    with open(doc['file_path'], "rb") as f:
-                        st.download_button("MUAT TURUN PDF", f.read(), doc['file_name'], type="primary", use_container_width=True)
-                else:
-                    st.warning("Fail PDF tidak dijumpai.")
-            st.stop()
-        else:
-            st.error("Standard tidak dijumpai.")
-            st.stop()
-    except ValueError:
-        st.error("ID tidak sah.")
-        st.stop()
-    except Exception as e:
-        st.error(f"Error direct access: {e}")
-        st.stop()
-
 # =============================================
 # HALAMAN UTAMA
 # =============================================
 if page == "Halaman Utama":
+    metrics.section("home")
     info = get_site_info()
     
     st.markdown("<div class='header-bg'><h1 style='text-align:center;color:white;'>RUJUKAN FAMA STANDARD</h1><p style='text-align:center;color:white;font-size:2rem;'>Keluaran Hasil Pertanian Malaysia</p></div>", unsafe_allow_html=True)
@@ -248,10 +367,7 @@ if page == "Halaman Utama":
     </div>
     """, unsafe_allow_html=True)
 
-    docs = get_docs()
-    total = len(docs)
-    baru = len([d for d in docs if (datetime.now() - datetime.strptime(d['upload_date'][:10], "%Y-%m-%d")).days <= 30])
-    cat_count = {cat: sum(1 for d in docs if d['category'] == cat) for cat in CATEGORIES}
+    total, baru, cat_count = catalog.stats()
 
     st.markdown(f"""
     <div style="background:linear-gradient(135deg,#00695c,#009688);border-radius:25px;padding:35px;color:white;margin:40px 0;">
@@ -261,7 +377,7 @@ if page == "Halaman Utama":
             <div class="stat-box"><h1 style="margin:0;color:#C8E6C9;">{baru}</h1><p>BARU (30 HARI)</p></div>
         </div>
         <div style="display:grid;grid-template-columns:repeat(auto-fit,minmax(140px,1fr));gap:25px;margin-top:40px;">
-            {''.join(f'<div class="stat-box"><strong>{cat}</strong><h2 style="margin:10px 0;color:#E8F5E8;">{cat_count[cat]}</h2></div>' for cat in CATEGORIES)}
+            {''.join(f'<div class="stat-box"><strong>{cat}</strong><h2 style="margin:10px 0;color:#E8F5E8;">{cat_count.get(cat, 0)}</h2></div>' for cat in CATEGORIES)}
         </div>
     </div>
     """, unsafe_allow_html=True)
@@ -269,87 +385,85 @@ if page == "Halaman Utama":
     col1, col2 = st.columns([3,1])
     with col1: cari = st.text_input("", placeholder="Cari tajuk standard...", key="cari")
     with col2: kat = st.selectbox("", ["Semua"] + CATEGORIES, key="kat")
-
-    filtered = [d for d in docs if (kat == "Semua" or d['category'] == kat) and (not cari or cari.lower() in d['title'].lower())]
-
-    per_page = 10
-    total_page = max(1, (len(filtered) + per_page - 1) // per_page)
-    if "page" not in st.session_state: 
-        st.session_state.page = 1
-
-    c1, c2, c3 = st.columns([1.5,3,1.5])
-    with c1:
-        if st.button("Sebelumnya", disabled=st.session_state.page <= 1):
-            st.session_state.page -= 1
-            st.rerun()
-    with c2:
-        st.markdown(f"<div style='text-align:center;padding:15px;background:#4CAF50;color:white;border-radius:15px;font-weight:bold;'>Halaman {st.session_state.page} / {total_page} • {len(filtered)} standard</div>", unsafe_allow_html=True)
-    with c3:
-        if st.button("Seterusnya", disabled=st.session_state.page >= total_page):
-            st.session_state.page += 1
-            st.rerun()
-
-    start = (st.session_state.page - 1) * per_page
-    for d in filtered[start:start+per_page]:
+    dalam = st.checkbox("Cari dalam kandungan PDF", key="cari_kandungan")
+
+    # Carian & pagination dalam SQL (FTS5 + keyset): hanya baris halaman ini diambil.
+    kat_filter = None if kat == "Semua" else kat
+    if dalam and cari.strip():
+        # Indeks teks muka surat (page_text_fts): paling relevan dahulu, terus ke muka surat
+        hits = search_text(cari, kat_filter)
+        if not hits:
+            st.warning("Tiada padanan dalam kandungan PDF.")
+        for h in hits:
+            url = static_url(h['file_path']) if h['file_path'] else None
+            where = f"<a href='{url}#page={h['page']}' target='_blank'>muka surat {h['page']}</a>" if url else f"muka surat {h['page']}"
+            st.markdown(f"<div class='card'><h4 style='margin:0;color:#1B5E20;'>{html.escape(h['title'])}</h4>"
+                        f"<small><b>{h['category']}</b> • {where}</small>"
+                        f"<p style='margin:8px 0 0;'>{snippet_html(h['snippet'])}</p></div>", unsafe_allow_html=True)
+        rows = []
+    else:
+        rows = keyset_page("home_pager", (cari, kat), lambda: count_docs(cari, kat_filter),
+                           lambda after, n: search_docs(cari, kat_filter, after, n), 10)
+
+    for d in rows:
         with st.container():
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             c1, c2 = st.columns([1,2])
             with c1:
-                img_path = d['thumbnail_path'] if d['thumbnail_path'] and os.path.exists(d['thumbnail_path']) else None
-                if img_path:
-                    st.image(img_path, use_container_width=True)
-                else:
-                    st.image("https://via.placeholder.com/400x600/4CAF50/white?text=FAMA", use_container_width=True)
+                render_thumbnail(d)
             with c2:
                 st.markdown(f"<h3 style='margin-top:0;color:#1B5E20;'>{d['title']}</h3>", unsafe_allow_html=True)
                 st.caption(f"**{d['category']}** • {d['upload_date'][:10]} • {d['uploaded_by']}")
-                if os.path.exists(d['file_path']):
-                    with open(d['file_path'], "rb") as f:
-                        st.download_button("MUAT TURUN PDF", f.read(), d['file_name'], use_container_width=True)
-                else:
-                    st.warning("Fail PDF tidak dijumpai.")
+                pdf_download(d)
             st.markdown("</div>", unsafe_allow_html=True)
 
-    if st.session_state.get("last_cari") != cari or st.session_state.get("last_kat") != kat:
-        st.session_state.page = 1
-        st.session_state.last_cari = cari
-        st.session_state.last_kat = kat
-
 # =============================================
 # PAPAR QR CODE
 # =============================================
 elif page == "Papar QR Code":
+    metrics.section("qr")
     st.markdown("<h1 style='text-align:center;color:#1B5E20;'>PAPAR QR CODE FAMA STANDARD</h1>", unsafe_allow_html=True)
     search = st.text_input("Cari ID atau Tajuk")
     if search.strip():
-        matches = [d for d in get_docs() if str(d['id']) == search.strip() or search.lower() in d['title'].lower()][:15]
+        matches = search_docs(search.strip(), limit=15)
         if not matches:
             st.warning("Tiada standard dijumpai.")
         else:
             for d in matches:
-                link = f"https://rujukan-fama-standard.streamlit.app/?doc={d['id']}"
-                qr = qrcode.QRCode(box_size=10, border=4)
-                qr.add_data(link)
-                qr.make(fit=True)
-                img = qr.make_image(fill_color="#1B5E20", back_color="white")
-                buf = BytesIO()
-                img.save(buf, "PNG")
-                buf.seek(0)
-                
+                link = qr.doc_link(d['id'])
+                png = qr.qr_png(d['id'])
+
                 col1, col2 = st.columns([1,2])
                 with col1:
-                    st.image(buf.getvalue(), caption=f"QR untuk {d['title']}", use_container_width=True)
-                    st.download_button("Download QR", buf.getvalue(), f"QR_{d['title'][:20]}.png", "image/png")
+                    st.image(png, caption=f"QR untuk {d['title']}", use_container_width=True)
+                    st.download_button("Download QR", png, f"QR_{d['title'][:20]}.png", "image/png", key=f"qr{d['id']}")
                 with col2:
                     st.markdown(f"### {d['title']}")
                     st.code(link)
                     st.caption(f"ID: {d['id']} • Kategori: {d['category']}")
                 st.markdown("---")
 
+    with st.expander("Cetak QR pukal ikut kategori"):
+        c1, c2 = st.columns(2)
+        with c1: sheet_cat = st.selectbox("Kategori", CATEGORIES, key="sheet_cat")
+        with c2: sheet_fmt = st.radio("Format", ["PDF (A4, 12 sehelai)", "ZIP (PNG)"], key="sheet_fmt")
+        if st.button("JANA QR PUKAL"):
+            sheet_docs = search_docs(category=sheet_cat)
+            if not sheet_docs:
+                st.warning("Tiada standard dalam kategori ini.")
+            else:
+                with st.spinner(f"Menjana {len(sheet_docs)} QR..."):
+                    stamp = datetime.now().strftime('%Y%m%d')
+                    if sheet_fmt.startswith("PDF"):
+                        st.download_button("Download Helaian QR", qr.qr_sheet_pdf(sheet_docs), f"QR_{qr.safe_name(sheet_cat)}_{stamp}.pdf", "application/pdf")
+                    else:
+                        st.download_button("Download ZIP QR", qr.qr_zip(sheet_docs), f"QR_{qr.safe_name(sheet_cat)}_{stamp}.zip", "application/zip")
+
 # =============================================
 # ADMIN PANEL
 # =============================================
 else:
+    metrics.section("admin")
     if not st.session_state.get("logged_in"):
         st.markdown("<h1 style='text-align:center;color:#1B5E20;'>ADMIN PANEL FAMA</h1>", unsafe_allow_html=True)
         c1, c2 = st.columns(2)
@@ -364,88 +478,173 @@ else:
                 st.rerun()
             else:
                 st.error("Salah bro!")
+        metrics.end_request()
         st.stop()
 
     st.success(f"ADMIN: {st.session_state.user.upper()}")
-    t1, t2, t3, t4 = st.tabs(["Tambah Standard", "Edit & Padam", "Chat + Backup", "Edit Info"])
+    t1, t2, t3, t4, t5 = st.tabs(["Tambah Standard", "Edit & Padam", "Chat + Backup", "Edit Info", "Prestasi"])
 
     with t1:
-        file = st.file_uploader("Upload PDF", type="pdf")
-        title = st.text_input("Tajuk")
+        # Selepas hantar, kunci uploader ditukar (nonce) + rerun supaya fail dikosongkan
+        # dan klik kedua tidak menghantar kerja yang sama lagi.
+        nonce = st.session_state.setdefault("upload_nonce", 0)
+        if "upload_msg" in st.session_state:
+            st.success(st.session_state.pop("upload_msg"))
+
+        def submitted(job_ids, msg):
+            st.session_state.setdefault("job_ids", []).extend(job_ids)
+            st.session_state.upload_msg = msg
+            st.session_state.upload_nonce += 1
+            st.rerun()
+
+        file = st.file_uploader("Upload PDF", type="pdf", key=f"file_{nonce}")
+        title = st.text_input("Tajuk", key=f"title_{nonce}")
         cat = st.selectbox("Kategori", CATEGORIES)
-        thumb = st.file_uploader("Thumbnail", type=["jpg","jpeg","png"])
+        thumb = st.file_uploader("Thumbnail", type=["jpg","jpeg","png"], key=f"thumb_{nonce}")
         if file and title and st.button("SIMPAN", type="primary"):
-            try:
-                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                fpath = f"uploads/{ts}_{file.name}"
-                with open(fpath, "wb") as f: f.write(file.getvalue())
-                tpath = save_thumbnail(thumb) if thumb else None
-                conn = sqlite3.connect(DB_NAME)
-                conn.execute("INSERT INTO documents (title,category,file_name,file_path,thumbnail_path,upload_date,uploaded_by) VALUES (?,?,?,?,?,?,?)",
-                             (title, cat, file.name, fpath, tpath, datetime.now().strftime("%Y-%m-%d %H:%M"), st.session_state.user))
-                conn.commit()
-                conn.close()
-                st.success("Berjaya!")
-                st.balloons()
-                st.rerun()
-            except Exception as e:
-                st.error(f"Gagal simpan: {e}")
+            submitted([jobs.submit_upload(file, file.name, title, cat, thumb, st.session_state.user)],
+                      "Dihantar untuk diproses!")
+
+        st.markdown("---")
+        st.markdown("#### Muat Naik Pukal")
+        batch = st.file_uploader("Beberapa PDF sekaligus (tajuk = nama fail)", type="pdf", accept_multiple_files=True, key=f"batch_{nonce}")
+        batch_cat = st.selectbox("Kategori", CATEGORIES, key="batch_cat")
+        if batch and st.button("SIMPAN SEMUA", type="primary"):
+            submitted([jobs.submit_upload(f, f.name, os.path.splitext(f.name)[0].replace("_", " "), batch_cat, None, st.session_state.user)
+                       for f in batch], f"{len(batch)} fail dihantar untuk diproses!")
+
+        st.markdown("---")
+        st.markdown("#### Import Pukal dari ZIP")
+        st.caption("ZIP berisi PDF (boleh dalam subfolder) + manifest.csv/json pilihan: file,title,category,thumbnail. "
+                   "Fail yang sudah ada dilangkau, jadi import boleh diulang jika terganggu.")
+        import_zip = st.file_uploader("Fail ZIP", type="zip", key=f"import_zip_{nonce}")
+        import_manifest = st.file_uploader("Manifest berasingan (pilihan)", type=["csv", "json"], key=f"import_manifest_{nonce}")
+        import_cat = st.selectbox("Kategori lalai", CATEGORIES, index=CATEGORIES.index("Lain-lain"), key="import_cat")
+        if import_zip and st.button("IMPORT PUKAL", type="primary"):
+            submitted([jobs.submit_bulk(import_zip, import_manifest, import_cat, st.session_state.user)],
+                      "Import dihantar untuk diproses!")
+
+        if st.session_state.get("job_ids"):
+            upload_status()
 
     with t2:
-        search = st.text_input("Cari ID atau tajuk")
-        docs = get_docs()
-        if search:
-            docs = [d for d in docs if search in str(d['id']) or search.lower() in d['title'].lower()]
-        for d in docs:
-            with st.expander(f"ID {d['id']} • {d['title']}"):
-                new_title = st.text_input("Tajuk", d['title'], key=f"title{d['id']}")
-                new_cat = st.selectbox("Kategori", CATEGORIES, CATEGORIES.index(d['category']), key=f"cat{d['id']}")
-                if st.button("KEMASKINI", key=f"up{d['id']}"):
-                    conn = sqlite3.connect(DB_NAME)
-                    conn.execute("UPDATE documents SET title=?, category=? WHERE id=?", (new_title, new_cat, d['id']))
-                    conn.commit()
-                    conn.close()
-                    st.success("Dikemaskini!")
+        c1, c2 = st.columns([3,1])
+        with c1: search = st.text_input("Cari ID atau tajuk", key="adm_cari")
+        with c2: adm_kat = st.selectbox("Kategori", ["Semua"] + CATEGORIES, key="adm_kat")
+        adm_filter = None if adm_kat == "Semua" else adm_kat
+        rows = keyset_page("admin_pager", (search, adm_kat), lambda: count_docs(search, adm_filter),
+                           lambda after, n: search_docs(search, adm_filter, after, n), 25)
+        if rows:
+            # Satu data_editor untuk seluruh halaman, bukan expander + 4 widget setiap dokumen.
+            edited = st.data_editor(
+                {"Pilih": [False] * len(rows), "ID": [d['id'] for d in rows], "Tajuk": [d['title'] for d in rows],
+                 "Kategori": [d['category'] for d in rows], "Tarikh": [d['upload_date'][:10] for d in rows]},
+                key=f"adm_table_{rows[0]['id']}_{rows[-1]['id']}", hide_index=True, use_container_width=True,
+                disabled=["ID", "Tarikh"],
+                column_config={"Kategori": st.column_config.SelectboxColumn(options=CATEGORIES, required=True)})
+            changes = [(d['id'], t, c) for d, t, c in zip(rows, edited["Tajuk"], edited["Kategori"])
+                       if (t, c) != (d['title'], d['category'])]
+            picked = [(d, t) for d, t, p in zip(rows, edited["Tajuk"], edited["Pilih"]) if p]
+
+            b1, b2, b3 = st.columns(3)
+            with b1:
+                if st.button("SIMPAN PERUBAHAN", disabled=not changes):
+                    catalog.update_many(changes)
+                    st.success(f"{len(changes)} standard dikemaskini!")
+                    st.rerun()
+            with b2:
+                bulk_cat = st.selectbox("Kategori baru untuk yang dipilih", CATEGORIES, key="bulk_cat")
+                if st.button("TUKAR KATEGORI", disabled=not picked):
+                    catalog.update_many([(d['id'], t, bulk_cat) for d, t in picked])
+                    st.success(f"{len(picked)} standard dipindah ke {bulk_cat}!")
+                    st.rerun()
+            with b3:
+                sah = st.checkbox(f"Sah padam {len(picked)} standard dipilih", disabled=not picked)
+                if st.button("PADAM TERPILIH", type="secondary", disabled=not (picked and sah)):
+                    for d in catalog.remove_many([d['id'] for d, _ in picked]):
+                        blobstore.release(d)
+                        thumbs.remove(d['thumbnail_path'])
+                    st.success("Dipadam!")
                     st.rerun()
-                if st.button("PADAM", key=f"del{d['id']}", type="secondary"):
-                    if st.button("SAH PADAM?", key=f"cf{d['id']}"):
-                        if os.path.exists(d['file_path']): os.remove(d['file_path'])
-                        if d['thumbnail_path'] and os.path.exists(d['thumbnail_path']): os.remove(d['thumbnail_path'])
-                        conn = sqlite3.connect(DB_NAME)
-                        conn.execute("DELETE FROM documents WHERE id=?", (d['id'],))
-                        conn.commit()
-                        conn.close()
-                        st.success("Dipadam!")
-                        st.rerun()
 
     with t3:
         c1, c2 = st.columns(2)
         with c1:
+            inc = st.checkbox("Inkremental (hanya fail yang berubah sejak backup terakhir)", disabled=not os.path.exists(backup.LAST_MANIFEST))
             if st.button("Download Backup ZIP"):
-                zipname = f"FAMA_BACKUP_{datetime.now().strftime('%Y%m%d_%H%M')}.zip"
-                with zipfile.ZipFile(zipname, "w", zipfile.ZIP_DEFLATED) as z:
-                    z.write(DB_NAME)
-                    for folder in ["uploads", "thumbnails"]:
-                        for root, _, files in os.walk(folder):
-                            for file in files:
-                                z.write(os.path.join(root, file), os.path.relpath(os.path.join(root, file)))
-                with open(zipname, "rb") as f:
-                    st.download_button("Download Backup", f.read(), zipname)
-                os.remove(zipname)
+                try:
+                    with st.spinner("Menjana backup..."):
+                        bpath, manifest = backup.publish_backup(inc)
+                    packed = sum(1 for f in manifest['files'].values() if f['in'] == "this")
+                    st.success(f"Backup {manifest['mode']}: {packed}/{len(manifest['files'])} fail dibungkus.")
+                    if not st.get_option("server.enableStaticServing"):
+                        st.warning(f"Static serving dimatikan (folder static/ melebihi 1 GB atau dimatikan dalam config); "
+                                   f"pautan muat turun tidak dapat dibuat. Fail di server: {os.path.abspath(bpath)}")
+                    elif os.path.getsize(bpath) > backup.STATIC_MAX_BYTES:
+                        st.info(f"Backup melebihi {backup.STATIC_MAX_BYTES // 1048576} MB, had muat turun melalui pelayar. "
+                                f"Fail di server: {os.path.abspath(bpath)} (atau strim terus: python backup.py -o -)")
+                    else:
+                        link = backup.share_link(bpath)
+                        st.markdown(f"<a class='fama-dl' href='{static_url(link)}' download='{os.path.basename(bpath)}'>Download Backup</a>", unsafe_allow_html=True)
+                        st.caption(f"Pautan sah selama {backup.LINK_TTL // 60} minit.")
+                except Exception as e:
+                    st.error(f"Gagal backup: {e}")
             st.markdown("<div class='restore-box'>", unsafe_allow_html=True)
             uploaded = st.file_uploader("Upload backup .zip", type="zip")
+            bases = st.file_uploader("Backup asas (untuk restore inkremental: backup penuh + inkremental sebelumnya)",
+                                     type="zip", accept_multiple_files=True, key="restore_bases")
+            use_live = st.checkbox("Guna fail sedia ada di server jika tiada dalam backup asas", key="restore_live")
             if uploaded and st.checkbox("Saya faham data akan diganti"):
                 if st.button("RESTORE SEKARANG", type="secondary"):
-                    with st.spinner("Restoring..."):
-                        for f in ["uploads", "thumbnails"]:
-                            if os.path.exists(f): shutil.rmtree(f); os.makedirs(f)
-                        with zipfile.ZipFile(uploaded) as z:
-                            z.extractall(".")
-                        st.success("RESTORE 100% BERJAYA!")
+                    bar = st.progress(0.0, text="Memulakan restore...")
+                    t0 = time.time()
+                    def on_progress(phase, done, total):
+                        rate = done / max(time.time() - t0, 1e-6) / 1024 / 1024
+                        bar.progress(min(done / max(total, 1), 1.0), text=f"{phase} • {done // 1048576}/{total // 1048576} MB • {rate:.1f} MB/s")
+                    try:
+                        # Penuh dahulu, kemudian inkremental ikut masa (nama fail bercap masa)
+                        chain = sorted(bases or [], key=lambda f: ("_INC_" in f.name, f.name))
+                        res = backup.restore_archive(uploaded, on_progress, chain, use_live)
+                        st.success(f"RESTORE 100% BERJAYA! {res['files']} fail, {res['bytes'] // 1048576} MB dalam {res['seconds']:.1f}s ({res['mb_per_s']:.1f} MB/s)")
                         st.balloons()
                         time.sleep(2)
                         st.rerun()
+                    except Exception as e:
+                        st.error(f"Restore gagal, data asal tidak diubah: {e}")
             st.markdown("</div>", unsafe_allow_html=True)
+            st.markdown("#### Storan PDF")
+            used = static_usage()
+            limit_mb = blobstore.STATIC_LIMIT // 1048576
+            if not st.get_option("server.enableStaticServing"):
+                st.error(f"Static serving dimatikan (static/ {used // 1048576} MB, had {limit_mb} MB, atau dimatikan dalam config). "
+                         "PDF, thumbnail dan pautan QR kini dihantar melalui skrip: seluruh PDF dibaca ke memori setiap muat turun. "
+                         "Kurangkan static/ di bawah had dan mulakan semula app.")
+            elif used >= blobstore.STATIC_WARN * blobstore.STATIC_LIMIT:
+                st.warning(f"static/ {used // 1048576} MB daripada had {limit_mb} MB. Jika melebihi had, Streamlit akan "
+                           "mematikan static serving pada restart seterusnya (muat turun PDF, thumbnail dan pautan QR menjadi perlahan).")
+            else:
+                st.caption(f"static/: {used // 1048576} MB daripada had {limit_mb} MB")
+            s1, s2 = st.columns(2)
+            with s1:
+                if st.button("MIGRASI KE STORAN BLOB"):
+                    with st.spinner("Memindahkan fail..."):
+                        res = blobstore.migrate(log=lambda m: None)
+                    catalog.invalidate()
+                    st.success(f"{res['moved']} fail dipindah, {res['freed'] // 1024} KB dijimatkan, {res['missing']} fail tiada.")
+            with s2:
+                if st.button("SEMAK INTEGRITI"):
+                    with st.spinner("Menyemak checksum..."):
+                        bad = blobstore.verify(log=lambda m: None)
+                    if bad:
+                        st.error("Fail rosak: " + ", ".join(bad))
+                    else:
+                        st.success("Semua fail PDF sah.")
+            st.markdown("#### Katalog Luar Talian")
+            off_text = st.checkbox("Sertakan teks kandungan PDF dalam carian", key="offline_text")
+            if st.button("EKSPORT KATALOG LUAR TALIAN"):
+                st.session_state.offline_job = jobs.submit_offline(off_text)
+            if st.session_state.get("offline_job"):
+                offline_status()
         with c2:
             if st.button("PADAM SEMUA CHAT", type="secondary"):
                 if st.session_state.get("confirm_clear"):
@@ -456,15 +655,24 @@ else:
                 else:
                     st.session_state.confirm_clear = True
                     st.warning("Tekan sekali lagi untuk sah!")
-            for m in reversed(get_chat_messages()):
+            msgs = chat_delta("chat_admin", 20, trim=False)
+
+            with st.form("admin_reply", clear_on_submit=True):
+                senders = list(dict.fromkeys(m['sender'] for m in reversed(msgs) if not m['is_admin']))
+                to = st.selectbox("Balas kepada", ["(semua)"] + senders)
+                r = st.text_area("Balas", height=80)
+                if st.form_submit_button("Hantar") and r.strip():
+                    add_chat_message("Admin FAMA", r.strip() if to == "(semua)" else f"@{to} {r.strip()}", True)
+                    st.rerun()
+
+            for m in reversed(msgs):
                 if m['is_admin']:
                     st.success(f"Admin: {m['message']}")
                 else:
                     st.info(f"{m['sender']}: {m['message']}")
-                    r = st.text_input("Balas", key=f"r{m['id']}")
-                    if st.button("Hantar", key=f"s{m['id']}"):
-                        add_chat_message("Admin FAMA", r, True)
-                        st.rerun()
+            if msgs and st.button("Muat mesej lebih lama"):
+                st.session_state.chat_admin["msgs"] = chat.feed.before(msgs[0]['id'], 20) + msgs
+                st.rerun()
 
     with t4:
         info = get_site_info()
@@ -476,8 +684,36 @@ else:
                 st.success("Berjaya!")
                 st.rerun()
 
+    with t5:
+        # Metrik proses ini sahaja (penimbal gelang dalam memori), bukan DB.
+        summ = metrics.summary()
+        st.markdown(f"#### Operasi (p50/p95 ms) • {sum(r['n'] for r in summ)} sampel terkini")
+        if summ:
+            st.dataframe([{k: round(v, 2) if isinstance(v, float) else v for k, v in r.items()} for r in summ],
+                         hide_index=True, use_container_width=True)
+        else:
+            st.info("Belum ada sampel.")
+        st.markdown("#### Kiraan (sejak proses bermula)")
+        st.dataframe([{"kiraan": k, "nilai": v} for k, v in sorted(metrics.counters().items())],
+                     hide_index=True, use_container_width=True)
+        st.markdown("#### Request paling perlahan")
+        st.dataframe([{"masa": datetime.fromtimestamp(r["started"]).strftime("%H:%M:%S"), "ms": round(r["ms"], 1),
+                       "bahagian": ", ".join(f"{k} {v:.0f}" for k, v in r["sections"].items()),
+                       "operasi utama": ", ".join(f"{op} {ms:.0f}ms x{n}" for op, (n, ms) in r["top_ops"]),
+                       "baris DB": int(r["counters"].get("db.rows", 0))} for r in metrics.slowest(15)],
+                     hide_index=True, use_container_width=True)
+        c1, c2 = st.columns(2)
+        with c1:
+            st.download_button("EKSPORT PROMETHEUS", lambda: metrics.prometheus().encode(), "fama_metrics.prom",
+                               "text/plain", use_container_width=True)
+        with c2:
+            if st.button("RESET METRIK", key="metrics_reset"):
+                metrics.reset()
+                st.rerun()
+
     if st.button("Log Keluar"):
         st.session_state.clear()
         st.rerun()
 
 st.markdown("<p style='text-align:center;color:gray;font-size:0.9rem;'>© Rujukan Standard FAMA • 2026 • Powered By Santana Techno!</p>", unsafe_allow_html=True)
+metrics.end_request()
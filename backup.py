@@ -0,0 +1,449 @@
+"""
+Backup ZIP secara streaming.
+
+Arkib dijana sebagai aliran ketulan bait (iter_backup) - tiada arkib penuh
+dalam memori. Media yang sudah termampat (PDF, JPEG, WebP, PNG) disimpan
+dengan ZIP_STORED; DB dan lain-lain dengan ZIP_DEFLATED. DB diambil melalui
+API backup dalam talian SQLite, jadi salinannya konsisten walaupun sesi lain
+sedang menulis.
+
+manifest.json (entri terakhir) menyenaraikan SEMUA fail semasa dengan saiz,
+mtime dan SHA-256. Mod inkremental menerima manifest backup sebelumnya dan
+hanya membungkus fail yang berubah; fail lain ditanda "base" dalam manifest.
+Restore inkremental mengambil fail "base" dari backup penuh/inkremental
+sebelumnya yang diberi bersama (bases), disemak dengan SHA-256 manifest -
+sistem semasa hanya digunakan jika diminta (use_live).
+
+Restore (restore_archive) mengekstrak ke direktori staging secara berketul,
+menyemak laluan, manifest dan checksum, dan hanya selepas semuanya sah baru
+menukar DB + folder media dengan os.replace (dengan rollback jika gagal).
+
+Arkib dari Admin Panel disimpan di backups/archives/, di luar static/:
+salinan semua blob + DB dalam static/ akan menggandakan saiznya (Streamlit
+mematikan static serving bila static/ > 1 GB) dan mendedahkan DB. Muat
+turun melalui pautan sementara (hard link) di static/backups/<token>/ yang
+dibuang selepas LINK_TTL.
+
+CLI:
+    python backup.py [-o FAIL.zip | -o -] [--incremental MANIFEST.json]
+    python backup.py --restore FAIL.zip [--base PENUH.zip --base INC1.zip ...] [--use-live]
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+import blobstore
+import chat
+import db
+import thumbs
+from catalog import catalog
+
+DATA_FOLDERS = ["uploads", os.path.join("static", "pdf"), blobstore.BLOB_DIR, "thumbnails", thumbs.THUMB_DIR]
+STORED_EXT = {".pdf", ".jpg", ".jpeg", ".png", ".webp", ".gif", ".zip", ".gz"}
+BACKUP_DIR = os.path.join("backups", "archives")   # di luar static/: tidak dihidang, tidak dikira had 1 GB
+LINK_DIR = os.path.join("static", "backups")        # pautan muat turun sementara sahaja
+LINK_TTL = 15 * 60
+LAST_MANIFEST = os.path.join("backups", "last_manifest.json")
+MANIFEST_NAME = "manifest.json"
+STAGING_DIR = ".restore_staging"
+TRASH_DIR = ".restore_trash"
+CHUNK = 1024 * 1024
+STATIC_MAX_BYTES = 200 * 1024 * 1024  # had saiz satu fail bagi server static Streamlit
+
+
+class _Sink:
+    """Objek fail tulis-sahaja (tak boleh seek) yang dikosongkan oleh iter_backup."""
+
+    def __init__(self):
+        self.parts = []
+        self.pos = 0
+
+    def write(self, b):
+        self.parts.append(bytes(b))
+        self.pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def snapshot_db(dest):
+    """Salinan DB yang konsisten melalui sqlite3 Connection.backup()."""
+    if db.dialect() != "sqlite":
+        raise RuntimeError("Backup DB hanya untuk SQLite; guna pg_dump untuk Postgres.")
+    src = sqlite3.connect(db.DB_NAME)
+    dst = sqlite3.connect(dest)
+    try:
+        src.backup(dst, pages=1024)
+    finally:
+        dst.close()
+        src.close()
+
+
+def scan_files(folders=DATA_FOLDERS):
+    """{laluan relatif: (saiz, mtime_ns)} untuk semua fail data."""
+    out = {}
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            for name in files:
+                if name.startswith(".incoming_") or name.endswith(".part"):
+                    continue
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                out[os.path.relpath(path).replace(os.sep, "/")] = (st.st_size, st.st_mtime_ns)
+    return out
+
+
+def load_manifest(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_backup(base_manifest=None, manifest_out=None):
+    """Jana arkib ZIP sebagai ketulan bait.
+
+    base_manifest: manifest backup sebelumnya -> mod inkremental.
+    manifest_out: dict yang diisi dengan manifest akhir (untuk disimpan).
+    """
+    base_files = (base_manifest or {}).get("files", {})
+    manifest = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "mode": "incremental" if base_manifest else "full",
+        "base": (base_manifest or {}).get("created"),
+        "db": os.path.basename(db.DB_NAME),
+        "files": {},
+    }
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as z:
+        tmpdir = tempfile.mkdtemp(prefix="fama_bak_")
+        try:
+            snap = os.path.join(tmpdir, "snapshot.db")
+            snapshot_db(snap)
+            entry = yield from _pack(z, sink, snap, manifest["db"], zipfile.ZIP_DEFLATED)
+            manifest["db_sha256"] = entry["sha256"]
+            manifest["db_size"] = entry["size"]
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        for rel, (size, mtime) in sorted(scan_files().items()):
+            prev = base_files.get(rel)
+            if prev and prev["size"] == size and prev["mtime_ns"] == mtime:
+                manifest["files"][rel] = {**prev, "in": "base"}
+                continue
+            method = zipfile.ZIP_STORED if os.path.splitext(rel)[1].lower() in STORED_EXT else zipfile.ZIP_DEFLATED
+            entry = yield from _pack(z, sink, rel, rel, method)
+            manifest["files"][rel] = {"size": entry["size"], "mtime_ns": mtime, "sha256": entry["sha256"], "in": "this"}
+
+        z.writestr(MANIFEST_NAME, json.dumps(manifest, indent=1))
+    yield sink.drain()
+    if manifest_out is not None:
+        manifest_out.update(manifest)
+
+
+def _pack(z, sink, path, arcname, method):
+    h = hashlib.sha256()
+    size = 0
+    info = zipfile.ZipInfo.from_file(path, arcname)
+    info.compress_type = method
+    with open(path, "rb") as src, z.open(info, "w", force_zip64=True) as dst:
+        while True:
+            chunk = src.read(CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+            dst.write(chunk)
+            size += len(chunk)
+            data = sink.drain()
+            if data:
+                yield data
+    return {"size": size, "sha256": h.hexdigest()}
+
+
+def save_backup(out_path, incremental=False, manifest_path=LAST_MANIFEST):
+    """Tulis backup ke fail (berketul) dan simpan manifest untuk backup inkremental seterusnya."""
+    base = load_manifest(manifest_path) if incremental else None
+    manifest = {}
+    tmp = out_path + ".part"
+    with open(tmp, "wb") as f:
+        for chunk in iter_backup(base, manifest):
+            f.write(chunk)
+    os.replace(tmp, out_path)
+    if manifest_path:
+        os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    return manifest
+
+
+def publish_backup(incremental=False):
+    """Backup ke backups/archives/ (di luar static/); pulangkan (laluan, manifest).
+
+    Backup penuh membuang arkib lama; backup inkremental disimpan bersama
+    rantaian asasnya supaya restore selepas kehilangan data masih boleh dibuat.
+    """
+    if not incremental and os.path.isdir(BACKUP_DIR):
+        shutil.rmtree(BACKUP_DIR)
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    kind = "INC" if incremental else "FULL"
+    path = os.path.join(BACKUP_DIR, f"FAMA_BACKUP_{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+    manifest = save_backup(path, incremental)
+    return path, manifest
+
+
+def share_link(path):
+    """Pautan rahsia sementara di static/backups/<token>/ (hard link, tiada salinan).
+
+    Dibuang selepas LINK_TTL oleh sweep_links(); None jika melebihi had server static.
+    """
+    sweep_links()
+    if os.path.getsize(path) > STATIC_MAX_BYTES:
+        return None
+    folder = os.path.join(LINK_DIR, secrets.token_urlsafe(24))
+    os.makedirs(folder)
+    link = os.path.join(folder, os.path.basename(path))
+    try:
+        os.link(path, link)
+    except OSError:
+        shutil.copyfile(path, link)
+    return link
+
+
+def sweep_links(ttl=LINK_TTL):
+    """Buang pautan muat turun yang lebih lama daripada ttl saat (ttl=0: semua)."""
+    if not os.path.isdir(LINK_DIR):
+        return 0
+    gone = 0
+    for name in os.listdir(LINK_DIR):
+        folder = os.path.join(LINK_DIR, name)
+        if time.time() - os.path.getmtime(folder) >= ttl:
+            shutil.rmtree(folder, ignore_errors=True)
+            gone += 1
+    return gone
+
+
+# =============================================
+# RESTORE
+# =============================================
+class RestoreError(Exception):
+    pass
+
+
+def _safe_member(info, db_name):
+    """Laluan relatif yang dibenarkan untuk satu entri ZIP, atau RestoreError."""
+    name = info.filename
+    if name.endswith("/"):
+        return None
+    try:
+        rel = blobstore.safe_zip_member(info)
+    except blobstore.UnsafePathError as e:
+        raise RestoreError(str(e)) from e
+    if rel in (db_name, MANIFEST_NAME):
+        return rel
+    if not any(rel.startswith(folder.replace(os.sep, "/") + "/") for folder in DATA_FOLDERS):
+        raise RestoreError(f"Fail di luar folder data: {name}")
+    return rel
+
+
+def _extract(z, info, dest, on_bytes):
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    h = hashlib.sha256()
+    with z.open(info) as src, open(dest, "wb") as out:
+        while True:
+            chunk = src.read(CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+            out.write(chunk)
+            on_bytes(len(chunk))
+    return h.hexdigest()
+
+
+def _check_db(path):
+    conn = sqlite3.connect(path)
+    try:
+        if conn.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+            raise RestoreError("DB dalam backup rosak (integrity_check gagal).")
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='documents'").fetchone():
+            raise RestoreError("DB dalam backup tiada jadual documents.")
+    except sqlite3.DatabaseError as e:
+        raise RestoreError(f"DB dalam backup tidak sah: {e}")
+    finally:
+        conn.close()
+
+
+def _swap(pairs):
+    """Gantikan setiap laluan live dengan laluan staging; rollback jika mana-mana gagal."""
+    os.makedirs(TRASH_DIR, exist_ok=True)
+    done = []
+    try:
+        for staged, live in pairs:
+            trash = os.path.join(TRASH_DIR, live.replace(os.sep, "__"))
+            if os.path.exists(live):
+                os.replace(live, trash)
+            done.append((live, trash))
+            if staged:
+                os.makedirs(os.path.dirname(live) or ".", exist_ok=True)
+                os.replace(staged, live)
+    except Exception:
+        for live, trash in reversed(done):
+            if os.path.isdir(live):
+                shutil.rmtree(live)
+            elif os.path.exists(live):
+                os.remove(live)
+            if os.path.exists(trash):
+                os.replace(trash, live)
+        raise
+    shutil.rmtree(TRASH_DIR, ignore_errors=True)
+
+
+def _base_members(archives, db_name):
+    """{laluan relatif: (ZipFile, ZipInfo)} dari arkib asas; arkib terkemudian menang."""
+    out = {}
+    for z in archives:
+        for info in z.infolist():
+            rel = _safe_member(info, db_name)
+            if rel and rel not in (db_name, MANIFEST_NAME):
+                out[rel] = (z, info)
+    return out
+
+
+def restore_archive(src, progress=None, bases=(), use_live=False):
+    """Restore dari ZIP (laluan atau fail-like). progress(fasa, bait_siap, jumlah_bait).
+
+    Backup inkremental: fail "base" diambil dari bases (backup penuh + inkremental
+    sebelumnya, laluan atau fail-like) dan disemak dengan SHA-256 dalam manifest.
+    use_live=True membenarkan fail yang sama pada sistem semasa digunakan jika tiada
+    dalam bases (hanya bila data asal masih ada).
+
+    Pulangkan statistik {files, bytes, seconds, mb_per_s}.
+    """
+    if db.dialect() != "sqlite":
+        raise RestoreError("Restore hanya untuk SQLite.")
+    progress = progress or (lambda *a: None)
+    started = time.time()
+    db_name = os.path.basename(db.DB_NAME)
+    shutil.rmtree(STAGING_DIR, ignore_errors=True)
+    os.makedirs(STAGING_DIR)
+    try:
+        with contextlib.ExitStack() as stack:
+            z = stack.enter_context(zipfile.ZipFile(src))
+            members = [(info, _safe_member(info, db_name)) for info in z.infolist()]
+            members = [(info, rel) for info, rel in members if rel]
+            names = {rel for _, rel in members}
+            if db_name not in names:
+                raise RestoreError(f"Backup tiada {db_name}.")
+            manifest = json.loads(z.read(MANIFEST_NAME)) if MANIFEST_NAME in names else None
+            expected, needed = {}, {}
+            if manifest:
+                expected = {rel: f["sha256"] for rel, f in manifest["files"].items()}
+                expected[db_name] = manifest.get("db_sha256")
+                needed = {rel: f for rel, f in manifest["files"].items() if f.get("in") == "base"}
+
+            # Fail "base": dari arkib asas dahulu, kemudian (jika dibenarkan) sistem semasa
+            from_base, from_live = [], []
+            if needed:
+                available = _base_members([stack.enter_context(zipfile.ZipFile(b)) for b in bases], db_name)
+                for rel, f in sorted(needed.items()):
+                    if rel in available:
+                        from_base.append((rel, *available[rel]))
+                    elif use_live and os.path.exists(rel) and os.path.getsize(rel) == f["size"]:
+                        from_live.append(rel)
+                    else:
+                        raise RestoreError(f"Backup inkremental perlukan fail asas yang tiada: {rel} "
+                                           f"(sertakan backup penuh/inkremental sebelumnya)")
+
+            total = (sum(info.file_size for info, rel in members if rel != MANIFEST_NAME)
+                     + sum(info.file_size for _, _, info in from_base)
+                     + sum(needed[rel]["size"] for rel in from_live))
+            done = [0]
+            def on_bytes(n):
+                done[0] += n
+                progress("Mengekstrak", done[0], total)
+
+            for info, rel in members:
+                if rel == MANIFEST_NAME:
+                    continue
+                digest = _extract(z, info, os.path.join(STAGING_DIR, rel), on_bytes)
+                if expected.get(rel) and digest != expected[rel]:
+                    raise RestoreError(f"Checksum tidak sepadan: {rel}")
+
+            for rel, bz, info in from_base:
+                if _extract(bz, info, os.path.join(STAGING_DIR, rel), on_bytes) != needed[rel]["sha256"]:
+                    raise RestoreError(f"Checksum fail asas tidak sepadan: {rel}")
+
+            for rel in from_live:
+                dest = os.path.join(STAGING_DIR, rel)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                if blobstore.file_sha256(rel) != needed[rel]["sha256"]:
+                    raise RestoreError(f"Fail asas pada sistem semasa telah berubah: {rel}")
+                try:
+                    os.link(rel, dest)
+                except OSError:
+                    shutil.copy2(rel, dest)
+                on_bytes(needed[rel]["size"])
+
+        progress("Menyemak DB", total, total)
+        _check_db(os.path.join(STAGING_DIR, db_name))
+
+        progress("Menukar data", total, total)
+        db.reset_pool()
+        pairs = [(os.path.join(STAGING_DIR, db_name), db.DB_NAME),
+                 (None, db.DB_NAME + "-wal"), (None, db.DB_NAME + "-shm")]
+        for folder in DATA_FOLDERS:
+            staged = os.path.join(STAGING_DIR, folder)
+            os.makedirs(staged, exist_ok=True)
+            pairs.append((staged, folder))
+        _swap(pairs)
+    finally:
+        shutil.rmtree(STAGING_DIR, ignore_errors=True)
+
+    db.init_db()
+    catalog.invalidate()
+    chat.feed.invalidate()
+    seconds = max(time.time() - started, 1e-6)
+    return {"files": len(members) + len(from_base) + len(from_live), "bytes": total, "seconds": seconds,
+            "mb_per_s": total / seconds / 1024 / 1024}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Backup FAMA Standard (ZIP streaming)")
+    ap.add_argument("-o", "--output", default=f"FAMA_BACKUP_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                    help="fail output, atau '-' untuk stdout")
+    ap.add_argument("--incremental", metavar="MANIFEST", help="manifest backup sebelumnya")
+    ap.add_argument("--restore", metavar="ZIP", help="restore dari fail backup")
+    ap.add_argument("--base", metavar="ZIP", action="append", default=[],
+                    help="backup asas bagi restore inkremental (boleh diulang, tertua dahulu)")
+    ap.add_argument("--use-live", action="store_true",
+                    help="benarkan fail asas diambil dari sistem semasa jika tiada dalam --base")
+    args = ap.parse_args()
+    if args.restore:
+        r = restore_archive(args.restore, lambda phase, d, t: print(f"\r{phase}: {d * 100 // max(t, 1)}%", end="", file=sys.stderr),
+                            args.base, args.use_live)
+        print(f"\n{r['files']} fail, {r['bytes']} bait, {r['seconds']:.1f}s ({r['mb_per_s']:.1f} MB/s)", file=sys.stderr)
+    elif args.output == "-":
+        for chunk in iter_backup(load_manifest(args.incremental)):
+            sys.stdout.buffer.write(chunk)
+    else:
+        m = save_backup(args.output, bool(args.incremental), args.incremental or LAST_MANIFEST)
+        packed = sum(1 for f in m["files"].values() if f["in"] == "this")
+        print(f"{args.output}: {packed}/{len(m['files'])} fail dibungkus ({m['mode']})", file=sys.stderr)
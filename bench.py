@@ -0,0 +1,325 @@
+"""
+Penanda aras (benchmark) dan ujian beban laluan panas app.
+
+Semua dijalankan dalam direktori sementara dengan DB sendiri: baris sintetik
+documents + chat_messages, PDF dummy (dalam storan blob) dan thumbnail
+diisi dahulu, kemudian setiap operasi diukur beberapa kali:
+
+    get_docs (katalog sejuk/panas), stats, penapis halaman utama, pagination
+    keyset, jana QR, save_thumbnail, backup penuh/inkremental, restore,
+    render halaman utama dan ?doc= melalui AppTest, dan imbasan QR serentak.
+
+Laporan: p50/p95/p99/max (ms), throughput (op/s) dan RSS puncak. Keputusan
+dibandingkan dengan baseline tersimpan; p95 yang melebihi baseline x
+(1 + toleransi) -> REGRESI dan exit 1. Parameter larian (dokumen, chat,
+imbasan, keserentakan) mesti sama dengan baseline; jika tidak, tiada
+perbandingan dibuat dan exit 2.
+
+    python bench.py                       # 10k dokumen, 200 imbasan
+    python bench.py --save-baseline       # simpan keputusan sebagai baseline
+    python bench.py --quick --baseline bench_baseline_quick.json [--save-baseline]
+
+AppTest tidak selamat-thread, jadi imbasan serentak hujung-ke-hujung dijalankan
+dalam beberapa proses (seperti beberapa pekerja server); laluan data ?doc=
+(lookup + thumbnail) juga diuji dengan thread dalam satu proses.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(ROOT, "bench_baseline.json")
+PARAMS = ("docs", "chat", "scans", "concurrency")
+APP = os.path.join(ROOT, "app.py")
+
+WORDS = ["Durian", "Mangga", "Pisang", "Nanas", "Betik", "Tembikai", "Cili", "Tomato", "Kobis",
+         "Sawi", "Bendi", "Terung", "Orkid", "Kekwa", "Ros", "Halia", "Kunyit", "Serai"]
+GRADES = ["Gred Premium", "Gred 1", "Gred 2", "Pembungkusan", "Pelabelan", "Penyimpanan Sejuk"]
+CHAT_WORDS = ["salam", "mohon", "standard", "terkini", "terima", "kasih", "PDF", "tidak", "boleh", "dibuka"]
+
+
+# =============================================
+# DATA SINTETIK
+# =============================================
+def _dummy_pdf(i):
+    try:
+        import pymupdf
+    except ImportError:
+        return b"%PDF-1.4\n%% dummy " + str(i).encode() + b"\n%%EOF\n"
+    pdf = pymupdf.open()
+    for p in range(3):
+        pdf.new_page().insert_text((72, 72), f"Standard {i} muka surat {p + 1}: {' '.join(random.sample(WORDS, 5))}")
+    return pdf.tobytes()
+
+
+def _dummy_image(i):
+    from PIL import Image
+    buf = BytesIO()
+    Image.new("RGB", (800, 1200), (40 + i * 7 % 200, 120, 60)).save(buf, "JPEG")
+    buf.seek(0)
+    return buf
+
+
+def seed(n_docs, n_chat, n_files=50, n_thumbs=20):
+    import blobstore
+    import chat
+    import db
+    import thumbs
+    from catalog import catalog
+
+    files = [blobstore.put_stream(BytesIO(_dummy_pdf(i)))[:2] for i in range(n_files)]
+    thumb_paths = [thumbs.save_thumbnail(_dummy_image(i)) for i in range(n_thumbs)]
+    cats = ["Keratan Bunga", "Sayur-sayuran", "Buah-buahan", "Lain-lain"]
+    rows = []
+    for i in range(n_docs):
+        sha, path = files[i % n_files]
+        day = time.strftime("%Y-%m-%d %H:%M", time.localtime(time.time() - (n_docs - i) * 86400 * 400 / n_docs))
+        rows.append({"title": f"{random.choice(WORDS)} {random.choice(GRADES)} {i}", "category": random.choice(cats),
+                     "file_name": f"standard_{i}.pdf", "file_path": path, "thumbnail_path": thumb_paths[i % n_thumbs],
+                     "upload_date": day, "uploaded_by": "admin", "sha256": sha})
+    msgs = [{"sender": "Admin FAMA" if i % 5 == 0 else f"Pengguna {i % 40}", "timestamp": "2026-01-01 10:00",
+             "message": " ".join(random.choices(CHAT_WORDS, k=8)), "is_admin": int(i % 5 == 0)} for i in range(n_chat)]
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO documents (title,category,file_name,file_path,thumbnail_path,upload_date,uploaded_by,sha256) "
+                         "VALUES (:title,:category,:file_name,:file_path,:thumbnail_path,:upload_date,:uploaded_by,:sha256)", rows)
+        conn.executemany("INSERT INTO chat_messages (sender,message,timestamp,is_admin) "
+                         "VALUES (:sender,:message,:timestamp,:is_admin)", msgs)
+    catalog.invalidate()
+    chat.feed.invalidate()
+
+
+# =============================================
+# PENGUKURAN
+# =============================================
+def pct(sorted_ms, p):
+    return sorted_ms[min(len(sorted_ms) - 1, max(0, round(p / 100 * len(sorted_ms) + 0.5) - 1))]
+
+
+def summarize(lat_ms, wall_s):
+    s = sorted(lat_ms)
+    return {"n": len(s), "p50": round(pct(s, 50), 3), "p95": round(pct(s, 95), 3), "p99": round(pct(s, 99), 3),
+            "max": round(s[-1], 3), "ops_s": round(len(s) / wall_s, 1) if wall_s else 0.0}
+
+
+def timed(fn, n):
+    lat = []
+    start = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        fn(i)
+        lat.append((time.perf_counter() - t) * 1000)
+    return summarize(lat, time.perf_counter() - start)
+
+
+def _apptest(doc_id=None):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=120)
+    if doc_id is not None:
+        at.query_params["doc"] = str(doc_id)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return at
+
+
+def _scan_worker(args):
+    """Proses pekerja ujian beban: imbasan ?doc= berturutan, sesi baru setiap kali."""
+    root, ids = args
+    sys.path.insert(0, root)
+    import logging
+    logging.disable(logging.WARNING)
+    _apptest(ids[0])  # import & cache proses; tidak dikira
+    lat = []
+    for doc_id in ids:
+        t = time.perf_counter()
+        _apptest(doc_id)
+        lat.append((time.perf_counter() - t) * 1000)
+    return lat, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(args):
+    import backup
+    import db
+    import qr
+    import thumbs
+    from catalog import catalog
+
+    results = {}
+    rng = random.Random(1)
+    ids = [r["id"] for r in db.query("SELECT id FROM documents")]
+
+    def record(name, res):
+        results[name] = res
+        print(f"  {name:<22} p50 {res['p50']:8.2f}  p95 {res['p95']:8.2f}  ({res['n']}x, {res['ops_s']:.1f} op/s)", flush=True)
+
+    def cold_docs(_):
+        catalog.invalidate()
+        catalog.docs()
+    record("get_docs_cold", timed(cold_docs, 5))
+    record("get_docs_warm", timed(lambda _: catalog.docs(), 200))
+    record("stats", timed(lambda _: catalog.stats(), 200))
+
+    terms = [w.lower() for w in WORDS] + ["gred premium", "sejuk", "", str(ids[len(ids) // 2])]
+    cats = [None, "Buah-buahan", "Sayur-sayuran"]
+    def home_filter(i):
+        term, cat = terms[i % len(terms)], cats[i % len(cats)]
+        db.count_docs(term, cat)
+        db.search_docs(term, cat, None, 10)
+    record("home_filter", timed(home_filter, 100))
+
+    cursor = {"after": None}
+    def next_page(_):
+        rows = db.search_docs(None, None, cursor["after"], 10)
+        cursor["after"] = rows[-1]["id"] if rows else None
+    record("pagination_page", timed(next_page, 200))
+
+    record("qr_encode", timed(lambda i: qr._encode(qr.doc_link(ids[i]), qr.FILL, qr.BACK), 50))
+    for i in range(50):
+        qr.qr_png(ids[i])
+    record("qr_png_cached", timed(lambda i: qr.qr_png(ids[i % 50]), 200))
+    record("save_thumbnail", timed(lambda i: thumbs.save_thumbnail(_dummy_image(i)), args.thumbs))
+
+    archive = os.path.abspath("bench_full.zip")
+    record("backup_full", timed(lambda _: backup.save_backup(archive, False, "bench_manifest.json"), args.backups))
+    record("backup_incremental", timed(lambda _: backup.save_backup("bench_inc.zip", True, "bench_manifest.json"), args.backups))
+    record("restore", timed(lambda _: backup.restore_archive(archive), args.backups))
+
+    def scan_data(i):
+        doc = catalog.lookup(ids[(i * 7919) % len(ids)])
+        thumbs.ensure_variants(doc["thumbnail_path"])
+    catalog.invalidate()
+    lat = []
+    def scan_timed(i):
+        t = time.perf_counter()
+        scan_data(i)
+        lat.append((time.perf_counter() - t) * 1000)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as ex:
+        list(ex.map(scan_timed, range(args.scans * 10)))
+    record("load_scan_data_threads", summarize(lat, time.perf_counter() - start))
+
+    scan_ids = [rng.choice(ids) for _ in range(args.scans)]
+    chunks = [scan_ids[w::args.concurrency] for w in range(args.concurrency) if scan_ids[w::args.concurrency]]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(len(chunks), mp_context=multiprocessing.get_context("spawn")) as ex:
+        out = list(ex.map(_scan_worker, [(ROOT, c) for c in chunks]))
+    record("load_scan_apptest", summarize([x for lat, _ in out for x in lat], time.perf_counter() - start))
+
+    # AppTest dalam proses ini mengganti sys.modules["__main__"], jadi pekerja
+    # spawn di atas mesti dicipta sebelum larian AppTest pertama di sini.
+    _apptest()  # pemanasan (import, cache_resource)
+    record("apptest_home", timed(lambda _: _apptest(), args.renders))
+    record("apptest_direct", timed(lambda i: _apptest(rng.choice(ids)), args.renders))
+
+    rss = {"rss_main_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+           "rss_worker_mb": round(max(r for _, r in out) / 1024, 1)}
+    print(f"  RSS puncak: proses utama {rss['rss_main_mb']:.0f} MB, pekerja beban {rss['rss_worker_mb']:.0f} MB")
+    return results, rss
+
+
+# =============================================
+# BASELINE
+# =============================================
+def compare(report, baseline, tolerance, slack_ms):
+    """Senarai regresi (teks). p95 dan RSS dibanding; slack_ms elak bunyi pada operasi sangat pantas."""
+    bad = []
+    for name, res in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        limit = base["p95"] * (1 + tolerance)
+        if res["p95"] > limit and res["p95"] - base["p95"] > slack_ms:
+            bad.append(f"{name}: p95 {res['p95']:.2f} ms > {limit:.2f} ms (baseline {base['p95']:.2f})")
+    for key, val in report["rss"].items():
+        base = baseline.get("rss", {}).get(key)
+        if base and val > base * (1 + tolerance):
+            bad.append(f"{key}: {val:.0f} MB > {base * (1 + tolerance):.0f} MB (baseline {base:.0f})")
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark & ujian beban FAMA Standard")
+    ap.add_argument("--docs", type=int, default=10000)
+    ap.add_argument("--chat", type=int, default=2000)
+    ap.add_argument("--scans", type=int, default=200, help="imbasan QR ?doc= dalam ujian beban")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--renders", type=int, default=20, help="larian AppTest setiap halaman")
+    ap.add_argument("--thumbs", type=int, default=20)
+    ap.add_argument("--backups", type=int, default=3)
+    ap.add_argument("--quick", action="store_true", help="set kecil (1k dokumen, 40 imbasan)")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.5, help="kenaikan p95 dibenarkan (0.5 = 50%%)")
+    ap.add_argument("--slack-ms", type=float, default=5.0)
+    ap.add_argument("--keep", action="store_true", help="jangan padam direktori kerja")
+    args = ap.parse_args()
+    if args.quick:
+        args.docs, args.chat, args.scans, args.concurrency = 1000, 200, 40, 4
+        args.renders, args.thumbs, args.backups = 5, 5, 1
+    params = {k: getattr(args, k) for k in PARAMS}
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            # Keputusan 1k dokumen tidak boleh "lulus" berbanding baseline 10k
+            print(f"RALAT: parameter {params} berbeza dengan baseline {args.baseline} {baseline.get('params')}; "
+                  "tiada perbandingan. Guna parameter baseline, atau --baseline lain dengan --save-baseline.")
+            return 2
+
+    random.seed(0)
+    work = tempfile.mkdtemp(prefix="fama_bench_")
+    shutil.copytree(os.path.join(ROOT, ".streamlit"), os.path.join(work, ".streamlit"))
+    os.chdir(work)
+    os.environ["FAMA_DB"] = os.path.join(work, "fama_standards.db")
+    os.environ.pop("DATABASE_URL", None)
+    sys.path.insert(0, ROOT)
+    import logging
+    logging.disable(logging.WARNING)
+    import db
+    try:
+        db.ensure_db()
+        t = time.perf_counter()
+        seed(args.docs, args.chat)
+        print(f"Data: {args.docs} dokumen, {args.chat} mesej chat ({time.perf_counter() - t:.1f}s) di {work}")
+        results, rss = run(args)
+    finally:
+        if not args.keep:
+            os.chdir(ROOT)
+            shutil.rmtree(work, ignore_errors=True)
+
+    report = {"params": params,
+              "machine": f"{platform.machine()} {os.cpu_count()} CPU, Python {platform.python_version()}",
+              "created": time.strftime("%Y-%m-%d %H:%M"), "results": results, "rss": rss}
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        print(f"Baseline disimpan: {args.baseline}")
+        return 0
+    if baseline is None:
+        print("Tiada baseline; jalankan dengan --save-baseline.")
+        return 0
+    bad = compare(report, baseline, args.tolerance, args.slack_ms)
+    if bad:
+        print("\n" + "!" * 60 + "\nREGRESI PRESTASI berbanding baseline " + baseline.get("created", ""))
+        for line in bad:
+            print("  " + line)
+        print("!" * 60)
+        return 1
+    print(f"\nTiada regresi berbanding baseline {baseline.get('created', '')} ({baseline.get('machine', '')}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
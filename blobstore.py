@@ -0,0 +1,228 @@
+"""
+Storan fail berasaskan kandungan (content-addressed) untuk PDF.
+
+Setiap PDF disimpan sekali sahaja di static/blobs/<2 aksara>/<sha256>.pdf.
+Muat naik semula fail yang sama tidak menambah bait baru; beberapa baris
+documents boleh berkongsi satu blob. Bilangan rujukan = bilangan baris
+documents dengan sha256 itu (berindeks), jadi ia tak boleh lari daripada
+data sebenar; blob hanya dipadam bila rujukan terakhir hilang.
+
+CLI:
+    python blobstore.py migrate   # pindahkan file_path lama ke dalam storan
+    python blobstore.py verify    # semak SHA-256 setiap blob
+    python blobstore.py gc        # buang blob tanpa rujukan
+
+Jalankan migrate semasa app dihentikan, atau guna butang di Admin Panel
+(katalog dalam memori app perlu dimuat semula selepas file_path berubah).
+
+Had: Streamlit mematikan static serving semasa mula jika static/ melebihi
+1 GB. Muat turun PDF kemudian jatuh balik ke read_verified() (seluruh fail
+ke memori, tanpa Range), jadi Admin Panel memberi amaran (static_usage)
+sebelum had itu dicapai.
+"""
+import hashlib
+import os
+import stat
+import sys
+
+import db
+import metrics
+
+STATIC_DIR = "static"
+BLOB_DIR = os.path.join(STATIC_DIR, "blobs")
+CHUNK = 1024 * 1024
+STATIC_LIMIT = 1024 ** 3   # MAX_APP_STATIC_FOLDER_SIZE Streamlit
+STATIC_WARN = 0.8          # amaran bila static/ mencapai 80% had
+
+
+class IntegrityError(Exception):
+    pass
+
+
+class UnsafePathError(ValueError):
+    pass
+
+
+def static_usage(folder=STATIC_DIR):
+    """Jumlah bait di bawah static/, dikira seperti semakan had Streamlit."""
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # fail sementara dipadam semasa imbasan
+    return total
+
+
+def blob_path(sha, ext=".pdf"):
+    return os.path.join(BLOB_DIR, sha[:2], sha + ext)
+
+
+def is_blob(path):
+    return bool(path) and os.path.abspath(path).startswith(os.path.abspath(BLOB_DIR) + os.sep)
+
+
+def safe_relpath(name):
+    """Laluan relatif ternormal (pemisah "/") dari ZIP atau manifest, atau UnsafePathError.
+
+    Dikongsi restore backup dan import pukal supaya kedua-duanya menolak laluan yang sama:
+    mutlak, keluar dari akar (..), awalan pemacu (C:) atau kosong.
+    """
+    norm = os.path.normpath(name.replace("\\", "/"))
+    parts = norm.split(os.sep)
+    if os.path.isabs(norm) or norm == "." or ".." in parts or ":" in parts[0]:
+        raise UnsafePathError(f"Laluan tidak selamat: {name}")
+    return "/".join(parts)
+
+
+def safe_zip_member(info):
+    """safe_relpath bagi satu entri ZIP; symlink juga ditolak."""
+    if stat.S_ISLNK(info.external_attr >> 16):
+        raise UnsafePathError(f"Symlink tidak dibenarkan: {info.filename}")
+    return safe_relpath(info.filename)
+
+
+@metrics.timed("file.put_stream")
+def put_stream(src, progress=None, total=None, ext=".pdf"):
+    """Simpan fail-like secara berketul; pulangkan (sha256, laluan, saiz).
+
+    Kandungan yang sudah wujud tidak ditulis semula (dedup).
+    """
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    tmp = os.path.join(BLOB_DIR, f".incoming_{os.getpid()}_{id(src)}")
+    h = hashlib.sha256()
+    size = 0
+    if hasattr(src, "seek"):
+        src.seek(0)
+    with open(tmp, "wb") as out:
+        while True:
+            chunk = src.read(CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+            if progress and total:
+                progress(size / total)
+    sha = h.hexdigest()
+    dest = blob_path(sha, ext)
+    if os.path.exists(dest):
+        os.remove(tmp)
+    else:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(tmp, dest)
+    return sha, dest, size
+
+
+def put_file(path, ext=".pdf"):
+    with open(path, "rb") as f:
+        return put_stream(f, ext=ext)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@metrics.timed("file.read_verified")
+def read_verified(path, sha=None):
+    """Baca fail penuh; jika sha diberi (atau fail ialah blob), sahkan SHA-256 dahulu."""
+    if not sha and is_blob(path):
+        sha = os.path.splitext(os.path.basename(path))[0]
+    with open(path, "rb") as f:
+        data = f.read()
+    metrics.count("file.bytes_read", len(data))
+    if sha and hashlib.sha256(data).hexdigest() != sha:
+        raise IntegrityError(f"Checksum tidak sepadan: {path}")
+    return data
+
+
+def refs(sha):
+    return db.query_one("SELECT COUNT(*) AS n FROM documents WHERE sha256 = :s", {"s": sha})["n"]
+
+
+def release(doc):
+    """Panggil selepas baris dokumen dipadam: buang fail jika tiada rujukan lain."""
+    path = doc.get("file_path")
+    if not path or not os.path.exists(path):
+        return False
+    if is_blob(path):
+        if doc.get("sha256") and refs(doc["sha256"]) > 0:
+            return False
+    elif db.query_one("SELECT 1 AS x FROM documents WHERE file_path = :p", {"p": path}):
+        return False
+    os.remove(path)
+    return True
+
+
+# =============================================
+# MIGRASI & PENYELENGGARAAN
+# =============================================
+def migrate(log=print):
+    """Pindahkan setiap file_path di luar storan ke dalam blob; fail pendua dibuang."""
+    moved = freed = missing = 0
+    for d in db.query("SELECT id, file_path, sha256 FROM documents ORDER BY id"):
+        path = d["file_path"]
+        if is_blob(path):
+            continue
+        if not path or not os.path.exists(path):
+            missing += 1
+            log(f"ID {d['id']}: fail tiada ({path})")
+            continue
+        sha, dest, size = put_file(path)
+        db.set_doc_file(d["id"], dest, sha)
+        if not db.query_one("SELECT 1 AS x FROM documents WHERE file_path = :p", {"p": path}):
+            os.remove(path)
+        if refs(sha) > 1:
+            freed += size
+        moved += 1
+        log(f"ID {d['id']}: {path} -> {dest}")
+    log(f"Dipindah: {moved}, tiada fail: {missing}, bait dijimatkan (dedup): {freed}")
+    return {"moved": moved, "missing": missing, "freed": freed}
+
+
+def iter_blobs():
+    if not os.path.isdir(BLOB_DIR):
+        return
+    for root, _, files in os.walk(BLOB_DIR):
+        for name in files:
+            if not name.startswith("."):
+                yield os.path.join(root, name)
+
+
+def verify(log=print):
+    """Semak checksum setiap blob; pulangkan senarai laluan yang rosak."""
+    bad = []
+    for path in iter_blobs():
+        sha = os.path.splitext(os.path.basename(path))[0]
+        if file_sha256(path) != sha:
+            bad.append(path)
+            log(f"ROSAK: {path}")
+    log(f"Disemak, {len(bad)} rosak.")
+    return bad
+
+
+def gc(log=print):
+    """Buang blob yang tiada rujukan dalam documents."""
+    used = {r["sha256"] for r in db.query("SELECT DISTINCT sha256 FROM documents WHERE sha256 IS NOT NULL")}
+    removed = 0
+    for path in iter_blobs():
+        if os.path.splitext(os.path.basename(path))[0] not in used:
+            os.remove(path)
+            removed += 1
+            log(f"Dibuang: {path}")
+    return removed
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd not in ("migrate", "verify", "gc"):
+        print(__doc__)
+        sys.exit(2)
+    db.init_db()
+    result = {"migrate": migrate, "verify": verify, "gc": gc}[cmd]()
+    sys.exit(1 if cmd == "verify" and result else 0)
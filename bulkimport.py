@@ -0,0 +1,266 @@
+"""
+Import pukal standard dari folder atau ZIP.
+
+Sumber: folder (dicari secara rekursif) atau ZIP berisi PDF, dengan manifest
+pilihan manifest.csv / manifest.json di akar sumber (atau diberi berasingan):
+
+    file,title,category,thumbnail
+    durian_gred1.pdf,Durian Gred 1,Buah-buahan,thumbs/durian.jpg
+
+JSON: senarai objek dengan kunci yang sama. Fail tanpa baris manifest guna
+nama fail sebagai tajuk dan kategori lalai. Baris dengan kategori di luar
+db.CATEGORIES atau laluan thumbnail tidak selamat ditanda gagal dalam
+laporan; fail lain tetap diimport.
+
+Setiap fail diproses selari (simpan blob + SHA-256, thumbnail, ekstrak teks);
+baris DB dimasukkan berkelompok, satu transaksi setiap kelompok (lalai: 200
+fail). Fail yang SHA-256-nya sudah ada dalam documents dilangkau, jadi import
+yang terganggu boleh dijalankan semula dan sambung dari kelompok terakhir.
+
+CLI:
+    python bulkimport.py FOLDER_ATAU_ZIP [--manifest M.csv] [--category Lain-lain]
+                         [--user import] [--workers 4] [--batch 200] [--report hasil.csv]
+"""
+import argparse
+import csv
+import json
+import os
+import secrets
+import shutil
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import blobstore
+import db
+import qr
+import textindex
+import thumbs
+from catalog import catalog
+
+WORKERS = int(os.environ.get("FAMA_WORKERS", "4"))
+BATCH = 200
+DEFAULT_CATEGORY = "Lain-lain"
+STAGING_DIR = ".import_staging"
+MANIFEST_NAMES = ("manifest.csv", "manifest.json")
+KEEP_EXT = (".pdf", ".jpg", ".jpeg", ".png", ".csv", ".json")
+
+IMPORTED, SKIPPED, FAILED = "diimport", "dilangkau (sudah ada)", "gagal"
+
+
+class BulkImportError(Exception):
+    pass
+
+
+# =============================================
+# SUMBER & MANIFEST
+# =============================================
+def _safe_rel(name, info=None):
+    """blobstore.safe_relpath / safe_zip_member dengan BulkImportError."""
+    try:
+        return blobstore.safe_zip_member(info) if info else blobstore.safe_relpath(name)
+    except blobstore.UnsafePathError as e:
+        raise BulkImportError(str(e)) from e
+
+
+def extract_zip(src, dest):
+    """Ekstrak PDF/imej/manifest dari ZIP (laluan atau fail-like) ke dest dengan semakan laluan."""
+    with zipfile.ZipFile(src) as z:
+        for info in z.infolist():
+            name = info.filename
+            if name.endswith("/") or not name.lower().endswith(KEEP_EXT):
+                continue
+            out = os.path.join(dest, _safe_rel(name, info))
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with z.open(info) as r, open(out, "wb") as w:
+                shutil.copyfileobj(r, w, blobstore.CHUNK)
+    return dest
+
+
+def load_manifest(path):
+    """{laluan relatif atau nama fail: {title, category, thumbnail}}."""
+    if not path:
+        return {}
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+        if isinstance(rows, dict):
+            rows = rows.get("files", [])
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+    out = {}
+    for r in rows:
+        key = (r.get("file") or "").strip().replace("\\", "/")
+        if key:
+            out[key] = {k: (r.get(k) or "").strip() for k in ("title", "category", "thumbnail")}
+    return out
+
+
+def plan(root, manifest=None, category=DEFAULT_CATEGORY):
+    """Senarai item import (satu setiap PDF di bawah root), tersusun ikut laluan."""
+    if manifest is None:
+        found = [os.path.join(root, n) for n in MANIFEST_NAMES if os.path.exists(os.path.join(root, n))]
+        manifest = load_manifest(found[0] if found else None)
+    known = {c.lower(): c for c in db.CATEGORIES}
+    items = []
+    for dirpath, _, files in os.walk(root):
+        for name in sorted(files):
+            if not name.lower().endswith(".pdf"):
+                continue
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            meta = manifest.get(rel) or manifest.get(name) or {}
+            item = {"file": rel, "src": path, "file_name": name,
+                    "title": meta.get("title") or os.path.splitext(name)[0].replace("_", " "),
+                    "category": meta.get("category") or category, "thumb": None}
+            try:
+                if item["category"].lower() not in known:
+                    raise BulkImportError(f"Kategori tidak sah: {item['category']} (pilih: {', '.join(db.CATEGORIES)})")
+                item["category"] = known[item["category"].lower()]
+                if meta.get("thumbnail"):
+                    item["thumb"] = os.path.join(root, _safe_rel(meta["thumbnail"]))
+            except BulkImportError as e:
+                item["error"] = str(e)  # prepare() melaporkannya sebagai gagal
+            items.append(item)
+    return sorted(items, key=lambda i: i["file"])
+
+
+# =============================================
+# PEMPROSESAN
+# =============================================
+_existing = set()
+
+
+def _init_worker(existing):
+    global _existing
+    _existing = existing
+
+
+def prepare(item):
+    """Kerja setiap fail (dalam pekerja): blob + SHA-256, thumbnail, teks. Tiada akses DB."""
+    if item.get("error"):
+        return {**item, "status": FAILED}
+    try:
+        with open(item["src"], "rb") as f:
+            if f.read(5) != b"%PDF-":
+                raise BulkImportError("bukan fail PDF")
+        sha, path, size = blobstore.put_file(item["src"])
+        if sha in _existing:
+            return {**item, "status": SKIPPED, "sha256": sha}
+        try:
+            if item["thumb"] and os.path.exists(item["thumb"]):
+                tpath = thumbs.save_thumbnail(item["thumb"])
+            else:
+                tpath = thumbs.pdf_thumbnail(path)
+        except Exception:
+            tpath = None  # thumbnail bukan wajib
+        try:
+            pages = textindex.extract_pages(path)  # None jika PyMuPDF tiada
+        except Exception:
+            pages = None  # tiada baris doc_text -> backfill textindex cuba semula
+        return {**item, "status": IMPORTED, "sha256": sha, "file_path": path, "size": size,
+                "thumbnail_path": tpath, "pages": pages}
+    except Exception as e:
+        return {**item, "status": FAILED, "error": str(e)}
+
+
+def _commit(batch, user):
+    rows = catalog.add_many([{**r, "uploaded_by": user} for r in batch])
+    for r, row in zip(batch, rows):
+        r["id"] = row["id"]
+        r.pop("pages", None)
+        try:
+            qr.qr_png(row["id"])
+        except Exception:
+            pass  # QR dijana semula bila dipaparkan
+
+
+def run(items, user="import", workers=WORKERS, batch=BATCH, processes=True, progress=None, log=None):
+    """Proses item secara selari dan masukkan ke DB berkelompok; pulangkan laporan setiap fail.
+
+    processes=False guna thread (contohnya dari dalam app Streamlit).
+    progress(siap, jumlah) dan log(teks) pilihan.
+    """
+    existing = {r["sha256"] for r in db.query("SELECT DISTINCT sha256 FROM documents WHERE sha256 IS NOT NULL")}
+    report, pending = [], []
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    # Set SHA sedia ada dihantar sekali setiap pekerja, bukan setiap fail
+    with pool_cls(max_workers=workers, initializer=_init_worker, initargs=(frozenset(existing),)) as pool:
+        futures = [pool.submit(prepare, item) for item in items]
+        for n, fut in enumerate(futures, 1):
+            r = fut.result()
+            if r["status"] == IMPORTED and r["sha256"] in existing:
+                thumbs.remove(r["thumbnail_path"])  # pendua dalam sumber yang sama
+                r = {**r, "status": SKIPPED}
+            if r["status"] == IMPORTED:
+                existing.add(r["sha256"])
+                pending.append(r)
+            report.append(r)
+            if len(pending) >= batch:
+                _commit(pending, user)
+                pending = []
+            if log:
+                log(f"[{n}/{len(items)}] {r['file']}: {r['status']}" + (f" ({r['error']})" if r.get("error") else ""))
+            if progress:
+                progress(n, len(items))
+    if pending:
+        _commit(pending, user)
+    return report
+
+
+def import_source(source, manifest=None, category=DEFAULT_CATEGORY, **kwargs):
+    """Import dari folder, laluan ZIP atau ZIP fail-like (upload). Pulangkan laporan."""
+    staging = None
+    try:
+        if not (isinstance(source, str) and os.path.isdir(source)):
+            staging = os.path.join(STAGING_DIR, secrets.token_hex(8))
+            os.makedirs(staging)
+            source = extract_zip(source, staging)
+        items = plan(source, load_manifest(manifest) if manifest else None, category)
+        if not items:
+            raise BulkImportError("Tiada PDF dalam sumber.")
+        return run(items, **kwargs)
+    finally:
+        if staging:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def summarize(report):
+    out = {IMPORTED: 0, SKIPPED: 0, FAILED: 0}
+    for r in report:
+        out[r["status"]] += 1
+    return out
+
+
+def write_report(report, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["file", "status", "id", "title", "category", "sha256", "error"])
+        for r in report:
+            w.writerow([r["file"], r["status"], r.get("id", ""), r["title"], r["category"],
+                        r.get("sha256", ""), r.get("error", "")])
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Import pukal standard FAMA dari folder atau ZIP")
+    ap.add_argument("source", help="folder atau fail ZIP")
+    ap.add_argument("--manifest", help="manifest CSV/JSON (lalai: manifest.csv/json dalam sumber)")
+    ap.add_argument("--category", default=DEFAULT_CATEGORY, choices=db.CATEGORIES, help="kategori bagi fail tanpa manifest")
+    ap.add_argument("--user", default="import")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--batch", type=int, default=BATCH, help="fail setiap transaksi DB")
+    ap.add_argument("--report", help="tulis laporan setiap fail ke CSV")
+    args = ap.parse_args()
+    db.init_db()
+    try:
+        report = import_source(args.source, args.manifest, args.category, user=args.user,
+                               workers=args.workers, batch=args.batch, log=print)
+    except (BulkImportError, zipfile.BadZipFile, OSError) as e:
+        print(f"Ralat: {e}", file=sys.stderr)
+        sys.exit(2)
+    if args.report:
+        write_report(report, args.report)
+    s = summarize(report)
+    print(f"Diimport: {s[IMPORTED]}, dilangkau: {s[SKIPPED]}, gagal: {s[FAILED]}")
+    sys.exit(1 if s[FAILED] else 0)
@@ -0,0 +1,199 @@
+"""
+Katalog dokumen dalam memori proses.
+
+Jadual documents dibaca sekali sahaja, kemudian setiap penulisan (tambah,
+kemaskini, padam) dikemaskini terus ke dalam cache bersama kiraan kategori dan
+senarai tarikh muat naik yang tersusun. Statistik "JUMLAH", "BARU (30 HARI)"
+dan kiraan kategori jadi O(log n), bukan imbasan penuh setiap rerun.
+
+Imbasan QR (?doc=) guna lookup(): jika katalog penuh belum dimuat, baris
+diambil satu-satu ikut id dan disimpan dalam LRU kecil, jadi proses yang baru
+bermula tak perlu membaca seluruh jadual untuk satu dokumen.
+
+Penulisan oleh proses lain (CLI bulkimport, replika lain pada DATABASE_URL
+yang sama): paling kerap sekali setiap REFRESH_INTERVAL saat, (bilangan,
+id terbesar) dalam DB dibanding dengan cache; jika berbeza katalog dimuat
+semula. lookup() yang terlepas cuba DB sebelum melaporkan "tidak dijumpai".
+Suntingan tajuk/kategori dari luar proses hanya kelihatan selepas muat
+semula; restore -> panggil invalidate().
+"""
+import bisect
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date, timedelta
+
+import db
+import metrics
+
+NEW_DAYS = 30
+LOOKUP_SIZE = 256
+REFRESH_INTERVAL = 3  # saat, seperti chat.PULL_INTERVAL
+
+
+class Catalog:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._rows = {}
+        self._dates = []
+        self._cat_count = Counter()
+        self._list = None
+        self._recent = OrderedDict()
+        self._checked = 0.0
+        self.version = 0
+
+    # ---------- dalaman ----------
+    def _refresh(self):
+        """invalidate() jika DB telah ditambah/dipadam oleh proses lain (berhad masa)."""
+        now = time.monotonic()
+        if not self._loaded or now - self._checked < REFRESH_INTERVAL:
+            return
+        self._checked = now
+        remote = db.doc_fingerprint()
+        with self._lock:
+            local = (len(self._rows), max(self._rows, default=None))
+        if remote != local:
+            metrics.count("catalog.stale")
+            self.invalidate()
+
+    def _ensure(self):
+        self._refresh()
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            metrics.count("catalog.load")
+            rows = db.get_docs()
+            self._rows = {r["id"]: r for r in rows}
+            self._dates = sorted((r["upload_date"] or "")[:10] for r in rows)
+            self._cat_count = Counter(r["category"] for r in rows)
+            self._list = None
+            self._loaded = True
+            self._checked = time.monotonic()
+            self.version += 1
+
+    def _index(self, row):
+        self._rows[row["id"]] = row
+        bisect.insort(self._dates, (row["upload_date"] or "")[:10])
+        self._cat_count[row["category"]] += 1
+
+    def _unindex(self, row):
+        d = (row["upload_date"] or "")[:10]
+        i = bisect.bisect_left(self._dates, d)
+        if i < len(self._dates) and self._dates[i] == d:
+            del self._dates[i]
+        self._cat_count[row["category"]] -= 1
+        del self._rows[row["id"]]
+
+    def _changed(self):
+        self._list = None
+        self.version += 1
+
+    def _forget(self, doc_ids):
+        with self._lock:
+            for i in doc_ids:
+                self._recent.pop(i, None)
+
+    # ---------- bacaan ----------
+    def docs(self):
+        """Semua dokumen, id terbaru dahulu (jangan ubah senarai yang dipulangkan)."""
+        self._ensure()
+        with self._lock:
+            if self._list is None:
+                self._list = [self._rows[i] for i in sorted(self._rows, reverse=True)]
+            return self._list
+
+    def lookup(self, doc_id):
+        """Satu dokumen ikut id tanpa memaksa katalog penuh dimuat (LRU)."""
+        self._refresh()
+        if self._loaded:
+            row = self._rows.get(doc_id)
+            if row is not None:
+                metrics.count("catalog.lookup_hit")
+                return row
+            # Mungkin ditambah oleh proses lain sejak semakan terakhir
+            metrics.count("catalog.lookup_miss")
+            row = db.get_doc(doc_id)
+            with self._lock:
+                if row and self._loaded and doc_id not in self._rows:
+                    self._index(row)
+                    self._changed()
+            return row
+        with self._lock:
+            if doc_id in self._recent:
+                metrics.count("catalog.lookup_hit")
+                self._recent.move_to_end(doc_id)
+                return self._recent[doc_id]
+        metrics.count("catalog.lookup_miss")
+        row = db.get_doc(doc_id)
+        if row:
+            with self._lock:
+                self._recent[doc_id] = row
+                while len(self._recent) > LOOKUP_SIZE:
+                    self._recent.popitem(last=False)
+        return row
+
+    def stats(self, today=None):
+        """(jumlah, baru dalam 30 hari, {kategori: bilangan})."""
+        self._ensure()
+        cutoff = ((today or date.today()) - timedelta(days=NEW_DAYS)).isoformat()
+        with self._lock:
+            baru = len(self._dates) - bisect.bisect_left(self._dates, cutoff)
+            return len(self._rows), baru, dict(self._cat_count)
+
+    # ---------- penulisan ----------
+    def add(self, title, category, file_name, file_path, thumbnail_path, uploaded_by, sha256=None):
+        doc_id = db.add_doc(title, category, file_name, file_path, thumbnail_path, uploaded_by, sha256)
+        row = db.get_doc(doc_id)
+        with self._lock:
+            if self._loaded and row and doc_id not in self._rows:
+                self._index(row)
+                self._changed()
+        return doc_id
+
+    def add_many(self, docs):
+        """Tambah pukal - satu transaksi DB (lihat db.add_docs). Pulangkan baris yang ditambah."""
+        rows = db.add_docs(docs)
+        with self._lock:
+            if self._loaded:
+                for row in rows:
+                    if row["id"] not in self._rows:
+                        self._index(row)
+                self._changed()
+        return rows
+
+    def update_many(self, changes):
+        """[(id, tajuk, kategori), ...] - satu transaksi DB."""
+        db.update_docs(changes)
+        self._forget([c[0] for c in changes])
+        with self._lock:
+            if self._loaded:
+                for doc_id, title, category in changes:
+                    old = self._rows.get(doc_id)
+                    if old:
+                        self._unindex(old)
+                        self._index({**old, "title": title, "category": category})
+                self._changed()
+
+    def remove_many(self, doc_ids):
+        """Padam pukal - satu transaksi DB. Pulangkan baris yang dipadam."""
+        rows = db.delete_docs(doc_ids)
+        self._forget([int(i) for i in doc_ids])
+        with self._lock:
+            if self._loaded:
+                for row in rows:
+                    if row["id"] in self._rows:
+                        self._unindex(self._rows[row["id"]])
+                self._changed()
+        return rows
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+            self._recent.clear()
+            self._changed()
+
+
+catalog = Catalog()
@@ -0,0 +1,93 @@
+"""
+Suapan chat dalam memori proses.
+
+Menyimpan KEEP mesej terakhir. Sidebar dan admin hanya minta mesej selepas
+kursor id masing-masing (since), jadi kos setiap paparan tetap walaupun
+sejarah chat mencecah ratusan ribu mesej. Hanya tulisan chat (add, clear)
+mengubah cache ini - tiada lagi st.cache_data.clear() global.
+
+Mesej yang ditulis proses lain (replika lain pada Postgres, CLI) ditarik
+dari DB semasa bacaan, paling kerap sekali setiap PULL_INTERVAL saat.
+"""
+import threading
+import time
+
+import db
+import metrics
+
+KEEP = 200
+PULL_INTERVAL = 3  # saat
+
+
+class ChatFeed:
+    def __init__(self, keep=KEEP):
+        self.keep = keep
+        self._lock = threading.RLock()
+        self._msgs = None
+        self._pulled = 0.0
+        self.epoch = 0  # naik bila chat dikosongkan; sesi dengan epoch lama mula semula
+
+    def _ensure(self):
+        if self._msgs is None:
+            with self._lock:
+                if self._msgs is None:
+                    self._msgs = db.get_recent_chat(self.keep)
+                    self._pulled = time.monotonic()
+
+    def _last_id(self):
+        return self._msgs[-1]["id"] if self._msgs else 0
+
+    def _pull(self):
+        """Ambil mesej baru dari DB (contohnya ditulis proses lain) ke dalam cache."""
+        new = db.get_chat_since(self._last_id())
+        self._pulled = time.monotonic()
+        if new:
+            self._msgs = (self._msgs + new)[-self.keep:]
+
+    def _refresh(self):
+        """_pull() jika tarikan terakhir lebih lama daripada PULL_INTERVAL (panggil dalam _lock)."""
+        if time.monotonic() - self._pulled >= PULL_INTERVAL:
+            self._pull()
+
+    def recent(self, n):
+        self._ensure()
+        with self._lock:
+            self._refresh()
+            return self._msgs[-n:]
+
+    def since(self, after_id, limit=None):
+        """Mesej dengan id > after_id, menaik."""
+        self._ensure()
+        with self._lock:
+            self._refresh()
+            if self._msgs and after_id < self._msgs[0]["id"] - 1:
+                metrics.count("chat.cache_miss")
+                return db.get_chat_since(after_id, limit)
+            metrics.count("chat.cache_hit")
+            out = [m for m in self._msgs if m["id"] > after_id]
+        return out[:limit] if limit else out
+
+    def before(self, before_id, limit):
+        return db.get_chat_before(before_id, limit)
+
+    def add(self, sender, message, is_admin=False):
+        self._ensure()
+        msg_id = db.add_chat_message(sender, message, is_admin)
+        with self._lock:
+            self._pull()
+        return msg_id
+
+    def clear(self):
+        db.clear_chat()
+        with self._lock:
+            self._msgs = []
+            self.epoch += 1
+
+    def invalidate(self):
+        """Muat semula dari DB pada bacaan seterusnya (contohnya selepas restore)."""
+        with self._lock:
+            self._msgs = None
+            self.epoch += 1
+
+
+feed = ChatFeed()
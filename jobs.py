@@ -0,0 +1,165 @@
+"""
+Barisan kerja latar belakang untuk pemprosesan upload.
+
+Skrip Streamlit hanya menghantar kerja (submit) dan terus selesai; simpan
+PDF ke storan blob (berketul + SHA-256), thumbnail, DB dan QR dibuat oleh
+thread pool proses ini. UI meninjau status melalui get()/list_jobs().
+
+Thread (bukan proses): kerja ini kebanyakannya I/O, hashlib dan Pillow/
+PyMuPDF melepaskan GIL, dan fail yang dimuat naik tak perlu disalin antara proses.
+Tiada panggilan st.* di sini - ia tiada konteks skrip dalam thread pekerja.
+"""
+import itertools
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import blobstore
+import bulkimport
+import offline
+import qr
+import textindex
+import thumbs
+from catalog import catalog
+
+WORKERS = int(os.environ.get("FAMA_WORKERS", "4"))
+KEEP_JOBS = 200
+
+PENDING, RUNNING, DONE, FAILED = "menunggu", "sedang diproses", "selesai", "gagal"
+
+
+class Job:
+    def __init__(self, job_id, label):
+        self.id = job_id
+        self.label = label
+        self.status = PENDING
+        self.step = ""
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.report = None  # laporan setiap fail (import pukal)
+
+    def update(self, step, progress=None):
+        self.step = step
+        if progress is not None:
+            self.progress = progress
+
+    @property
+    def active(self):
+        return self.status in (PENDING, RUNNING)
+
+
+_executor = None
+_jobs = {}
+_lock = threading.Lock()
+_ids = itertools.count(1)
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="fama-job")
+        return _executor
+
+def _run(job, fn, args, kwargs):
+    job.status = RUNNING
+    try:
+        job.result = fn(job, *args, **kwargs)
+        job.status = DONE
+        job.progress = 1.0
+    except Exception as e:
+        job.error = str(e)
+        job.status = FAILED
+    finally:
+        job.finished = time.time()
+
+def submit(label, fn, *args, **kwargs):
+    """Hantar fn(job, *args, **kwargs) ke pool; pulangkan id kerja."""
+    job = Job(next(_ids), label)
+    with _lock:
+        _jobs[job.id] = job
+        for old in sorted(_jobs)[:-KEEP_JOBS]:
+            if not _jobs[old].active:
+                del _jobs[old]
+    _pool().submit(_run, job, fn, args, kwargs)
+    return job.id
+
+def get(job_id):
+    return _jobs.get(job_id)
+
+def list_jobs(job_ids):
+    return [_jobs[i] for i in job_ids if i in _jobs]
+
+# =============================================
+# PEMPROSESAN UPLOAD
+# =============================================
+def process_upload(job, src, file_name, title, category, thumb, user):
+    """Simpan PDF ke storan blob, jana thumbnail, masuk DB, QR dan teks. Pulangkan id dokumen."""
+    job.update("Menyimpan PDF", 0.0)
+    sha, fpath, _ = blobstore.put_stream(src, lambda p: job.update("Menyimpan PDF", 0.5 * p),
+                                         getattr(src, "size", None))
+
+    job.update("Menjana thumbnail", 0.6)
+    try:
+        tpath = thumbs.save_thumbnail(thumb) if thumb else thumbs.pdf_thumbnail(fpath)
+    except Exception:
+        tpath = None  # thumbnail bukan wajib; placeholder akan dipaparkan
+
+    job.update("Mengindeks", 0.7)
+    doc_id = catalog.add(title, category, file_name, fpath, tpath, user, sha)
+    qr.qr_png(doc_id)
+
+    job.update("Mengekstrak teks", 0.8)
+    try:
+        textindex.index_doc(doc_id, fpath, sha)
+    except Exception:
+        pass  # dokumen tetap boleh dicari ikut tajuk; backfill boleh cuba semula
+    return doc_id
+
+def submit_upload(src, file_name, title, category, thumb, user):
+    return submit(title, process_upload, src, file_name, title, category, thumb, user)
+
+
+def process_bulk(job, src, manifest, category, user):
+    """Import pukal dari ZIP (upload); manifest pilihan (upload CSV/JSON). Pulangkan ringkasan."""
+    job.update("Mengekstrak ZIP", 0.0)
+    mpath = None
+    try:
+        if manifest is not None:
+            with tempfile.NamedTemporaryFile(suffix=os.path.splitext(manifest.name)[1], delete=False) as f:
+                f.write(manifest.getvalue())
+                mpath = f.name
+        job.report = bulkimport.import_source(
+            src, mpath, category, user=user, processes=False,
+            progress=lambda done, total: job.update(f"Memproses {done}/{total} fail", done / total))
+    finally:
+        if mpath:
+            os.remove(mpath)
+    return bulkimport.summarize(job.report)
+
+def submit_bulk(src, manifest, category, user):
+    return submit(f"Import pukal {src.name}", process_bulk, src, manifest, category, user)
+
+
+def process_offline(job, with_text):
+    """Eksport katalog luar talian (salin PDF/thumbnail yang berubah). Pulangkan ringkasan."""
+    job.update("Menyediakan", 0.0)
+    res = offline.export(with_text=with_text,
+                         progress=lambda done, total: job.update(f"Dokumen {done}/{total}", 0.95 * done / total))
+    return {"dokumen": res["docs"], "dijana": res["rendered"], "dibuang": res["removed"], "fail dikemas kini": res["files"]}
+
+_offline_lock = threading.Lock()
+_offline_job = None
+
+def submit_offline(with_text):
+    """Satu eksport pada satu masa (folder output dikongsi); pulangkan id kerja yang sedang berjalan jika ada."""
+    global _offline_job
+    with _offline_lock:
+        job = _jobs.get(_offline_job)
+        if job is None or not job.active:
+            _offline_job = submit("Eksport katalog luar talian", process_offline, with_text)
+        return _offline_job
@@ -0,0 +1,227 @@
+"""
+Instrumentasi prestasi ringan (dalam memori proses).
+
+Setiap operasi yang dibalut timer()/@timed() direkod ke dalam penimbal
+gelang (deque) bersama kiraan kumulatif; count() untuk baris diimbas, bait
+dibaca, cache hit/miss. Setiap rerun Streamlit ialah satu "request":
+begin_request() di atas skrip, section() di setiap bahagian halaman, dan
+operasi dalam thread skrip itu dijumlahkan ke request tersebut. Thread lain
+(kerja latar belakang) hanya masuk ke sampel global.
+
+Request yang berakhir melalui st.rerun()/st.stop() dikira sehingga
+operasi/bahagian terakhir yang direkod.
+
+Eksport Prometheus: prometheus() (butang di Admin Panel), atau set env
+FAMA_METRICS_FILE untuk ditulis berkala bagi textfile collector node_exporter.
+"""
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+KEEP_SAMPLES = int(os.environ.get("FAMA_METRICS_SAMPLES", "5000"))
+KEEP_REQUESTS = 200
+EXPORT_FILE = os.environ.get("FAMA_METRICS_FILE")
+EXPORT_INTERVAL = 15
+QUANTILES = (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99"))
+
+_lock = threading.Lock()
+_samples = deque(maxlen=KEEP_SAMPLES)      # (op, ms, masa)
+_requests = deque(maxlen=KEEP_REQUESTS)
+_totals = defaultdict(lambda: [0, 0.0])    # op -> [bilangan, jumlah ms] sejak proses bermula
+_counters = defaultdict(float)
+_local = threading.local()
+_started = time.time()
+
+
+class Request:
+    def __init__(self):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.ms = 0.0
+        self.ops = defaultdict(lambda: [0, 0.0])
+        self.counters = defaultdict(float)
+        self.sections = {}
+        self._section = None
+        self._section_t0 = None
+
+    def touch(self):
+        self.ms = (time.perf_counter() - self._t0) * 1000
+
+    def snapshot(self, n_ops=3):
+        """Salinan dict: request sesi lain mungkin masih dikemas kini oleh thread skripnya.
+
+        dict(...) disalin dalam satu langkah C (tiada iterasi Python atas dict yang berubah).
+        """
+        ops = dict(self.ops)
+        top = sorted(((op, tuple(v)) for op, v in ops.items()), key=lambda kv: -kv[1][1])[:n_ops]
+        return {"started": self.started, "ms": self.ms, "sections": dict(self.sections),
+                "top_ops": top, "counters": dict(self.counters)}
+
+
+def current():
+    return getattr(_local, "request", None)
+
+
+def begin_request():
+    req = Request()
+    _local.request = req
+    with _lock:
+        _requests.append(req)
+    return req
+
+
+def section(name):
+    """Tutup bahagian halaman semasa (jika ada) dan mula bahagian baru."""
+    req = current()
+    if req is None:
+        return
+    now = time.perf_counter()
+    if req._section:
+        ms = (now - req._section_t0) * 1000
+        req.sections[req._section] = req.sections.get(req._section, 0.0) + ms
+        _add(f"section.{req._section}", ms, None)
+    req._section, req._section_t0 = name, now
+    req.touch()
+
+
+def end_request():
+    section(None)
+    _local.request = None
+
+
+def _add(op, ms, req):
+    with _lock:
+        _samples.append((op, ms, time.time()))
+        t = _totals[op]
+        t[0] += 1
+        t[1] += ms
+    if req is not None:
+        o = req.ops[op]
+        o[0] += 1
+        o[1] += ms
+        req.touch()
+
+
+def record(op, ms):
+    _add(op, ms, current())
+
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] += n
+    req = current()
+    if req is not None:
+        req.counters[name] += n
+
+
+@contextmanager
+def timer(op):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(op, (time.perf_counter() - t) * 1000)
+
+
+def timed(op):
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(op, (time.perf_counter() - t) * 1000)
+        return inner
+    return wrap
+
+
+# =============================================
+# RINGKASAN & EKSPORT
+# =============================================
+def _pct(sorted_ms, q):
+    return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))]
+
+
+def summary():
+    """[{op, n, p50, p95, p99, max}] daripada sampel dalam penimbal, p95 tertinggi dahulu."""
+    with _lock:
+        by_op = defaultdict(list)
+        for op, ms, _ in _samples:
+            by_op[op].append(ms)
+    rows = []
+    for op, lat in by_op.items():
+        lat.sort()
+        rows.append({"op": op, "n": len(lat), "p50": _pct(lat, 0.5), "p95": _pct(lat, 0.95),
+                     "p99": _pct(lat, 0.99), "max": lat[-1]})
+    return sorted(rows, key=lambda r: -r["p95"])
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+def slowest(n=10):
+    """Request paling perlahan sebagai salinan dict (lihat Request.snapshot)."""
+    with _lock:
+        reqs = list(_requests)
+    return [r.snapshot() for r in sorted(reqs, key=lambda r: -r.ms)[:n]]
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _requests.clear()
+        _totals.clear()
+        _counters.clear()
+
+
+def _metric_name(name):
+    return "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def prometheus():
+    """Format teks Prometheus: summary setiap operasi + counter kumulatif."""
+    by_op = {r["op"]: r for r in summary()}
+    with _lock:
+        totals = {op: tuple(v) for op, v in _totals.items()}
+        counts = dict(_counters)
+    out = ["# HELP fama_op_duration_seconds Tempoh operasi; kuantil dari sampel terkini.",
+           "# TYPE fama_op_duration_seconds summary"]
+    for op in sorted(totals):
+        n, total = totals[op]
+        if op in by_op:
+            for q, key in QUANTILES:
+                out.append(f'fama_op_duration_seconds{{op="{op}",quantile="{q}"}} {by_op[op][key] / 1000:.6f}')
+        out.append(f'fama_op_duration_seconds_sum{{op="{op}"}} {total / 1000:.6f}')
+        out.append(f'fama_op_duration_seconds_count{{op="{op}"}} {n}')
+    for name in sorted(counts):
+        metric = f"fama_{_metric_name(name)}_total"
+        out += [f"# TYPE {metric} counter", f"{metric} {counts[name]:g}"]
+    out += ["# TYPE fama_process_start_time_seconds gauge", f"fama_process_start_time_seconds {_started:.0f}"]
+    return "\n".join(out) + "\n"
+
+
+def _export_loop(path):
+    while True:
+        time.sleep(EXPORT_INTERVAL)
+        try:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(prometheus())
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+
+def start_exporter(path=EXPORT_FILE):
+    """Tulis prometheus() ke fail setiap EXPORT_INTERVAL saat (sekali setiap proses)."""
+    if not path or getattr(start_exporter, "started", False):
+        return False
+    start_exporter.started = True
+    threading.Thread(target=_export_loop, args=(path,), daemon=True, name="fama-metrics").start()
+    return True
@@ -0,0 +1,354 @@
+"""
+Eksport katalog luar talian (laman statik).
+
+Katalog documents dijana sebagai folder statik yang boleh dihidang oleh
+mana-mana server fail statik (nginx, S3, `python -m http.server`) atau
+disalin terus ke tablet dan dibuka melalui file:// - tiada sesi Streamlit
+untuk setiap imbasan QR:
+
+    index.html          senarai + carian (JS biasa, tanpa rangkaian)
+    index.json          indeks JSON semua dokumen
+    catalog.js          indeks yang sama sebagai skrip (file:// tak boleh fetch JSON)
+    search.js           indeks carian: token -> [id]
+    doc/<id>.html       halaman setiap standard
+    thumbs/             varian thumbnail (WebP + JPEG)
+    pdf/<sha256>.pdf    PDF, dinamakan ikut kandungan
+
+HTML/JS/JSON ditulis bersama .gz (dan .br jika modul brotli dipasang) untuk
+gzip_static / brotli_static. index.html?doc=<id> diubah hala ke doc/<id>.html,
+jadi QR boleh dijana terus ke laman ini (FAMA_BASE_URL=<url laman>).
+
+Inkremental: .offline_state.json menyimpan hash kandungan setiap dokumen
+(metadata + SHA-256 PDF + thumbnail) dan setiap fail bersama (SHA-256 PDF
+lama tanpa sha256 dalam DB dicache ikut saiz + mtime); hanya dokumen
+yang hash-nya berubah dijana semula, dan fail yang tidak berubah tidak
+ditulis semula (mtime/ETag kekal untuk cache pelayar). Dokumen yang dipadam
+dibuang dari laman bersama PDF/thumbnail yang tidak dirujuk lagi.
+
+CLI:
+    python offline.py [-o fama_offline] [--text] [--no-pdf] [--force]
+"""
+import argparse
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import sys
+import unicodedata
+from collections import defaultdict
+
+import blobstore
+import db
+import metrics
+import thumbs
+
+OUT_DIR = os.environ.get("FAMA_OFFLINE_DIR", "fama_offline")
+STATE_NAME = ".offline_state.json"
+RENDER_VERSION = 1  # naikkan bila templat berubah -> semua halaman dijana semula
+COMPRESS_EXT = (".html", ".js", ".json")
+MIN_TOKEN = 2
+FIELDS = ("id", "title", "category", "file_name", "upload_date", "sha256")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def tokens(text):
+    """Token carian: huruf kecil, tanpa diakritik; sama seperti norm() dalam index.html."""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return {t for t in _TOKEN.findall(text) if len(t) >= MIN_TOKEN}
+
+
+# =============================================
+# PENULISAN FAIL
+# =============================================
+class Site:
+    """Folder output + keadaan eksport sebelumnya."""
+
+    def __init__(self, out_dir, force=False):
+        self.out = out_dir
+        self.br = _brotli()
+        self.state_path = os.path.join(out_dir, STATE_NAME)
+        state = {}
+        if not force and os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        if state.get("version") != RENDER_VERSION:
+            state = {}
+        self.docs = state.get("docs", {})
+        self.files = state.get("files", {})
+        self._hashes = state.get("hashes", {})
+        self.hashes = {}
+        self.written = 0
+
+    def file_sha(self, path):
+        """SHA-256 fail lama (tanpa sha256 dalam DB), dicache ikut saiz + mtime dalam state."""
+        st = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            sha = cached[2]
+        else:
+            sha = blobstore.file_sha256(path)
+        self.hashes[path] = [st.st_size, st.st_mtime_ns, sha]
+        return sha
+
+    def path(self, rel):
+        return os.path.join(self.out, *rel.split("/"))
+
+    def write(self, rel, data):
+        """Tulis fail teks (+ .gz/.br) hanya jika kandungannya berubah."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(rel)
+        if self.files.get(rel) == digest and os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        variants = {"": data}
+        if rel.endswith(COMPRESS_EXT):
+            variants[".gz"] = gzip.compress(data, 9, mtime=0)
+            if self.br:
+                variants[".br"] = self.br.compress(data)
+        for suffix in (".gz", ".br"):
+            if suffix not in variants and os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        for suffix, blob in variants.items():
+            tmp = f"{path}{suffix}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path + suffix)
+        self.files[rel] = digest
+        self.written += 1
+        return True
+
+    def copy(self, src, rel):
+        """Salin media (sudah termampat) jika belum ada atau saiznya berbeza."""
+        dest = self.path(rel)
+        if os.path.exists(dest) and os.path.getsize(dest) == os.path.getsize(src):
+            return False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copyfile(src, dest + ".tmp")
+        os.replace(dest + ".tmp", dest)
+        self.written += 1
+        return True
+
+    def remove(self, rel):
+        for suffix in ("", ".gz", ".br"):
+            if os.path.exists(self.path(rel) + suffix):
+                os.remove(self.path(rel) + suffix)
+        self.files.pop(rel, None)
+
+    def prune(self, folder, keep):
+        """Buang fail dalam folder yang tidak dirujuk lagi; pulangkan bilangan."""
+        root = self.path(folder)
+        if not os.path.isdir(root):
+            return 0
+        gone = 0
+        for name in os.listdir(root):
+            if name not in keep:
+                os.remove(os.path.join(root, name))
+                gone += 1
+        return gone
+
+    def save_state(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": RENDER_VERSION, "docs": self.docs, "files": self.files, "hashes": self.hashes}, f)
+        os.replace(tmp, self.state_path)
+
+
+# =============================================
+# TEMPLAT
+# =============================================
+CSS = """
+*{box-sizing:border-box}body{margin:0;font-family:system-ui,-apple-system,Segoe UI,Roboto,sans-serif;background:#f1f8e9;color:#1b1b1b}
+header{background:linear-gradient(135deg,#1B5E20,#4CAF50);color:#fff;padding:18px 16px;text-align:center}
+header h1{margin:0;font-size:1.4rem}header p{margin:4px 0 0;opacity:.9;font-size:.9rem}
+main{max-width:1100px;margin:0 auto;padding:16px}a{color:#1B5E20}
+.bar{display:flex;gap:8px;flex-wrap:wrap;margin-bottom:12px}
+.bar input,.bar select{flex:1 1 220px;padding:12px;border:2px solid #4CAF50;border-radius:10px;font-size:1rem}
+.grid{display:grid;grid-template-columns:repeat(auto-fill,minmax(160px,1fr));gap:14px}
+.card{background:#fff;border-radius:14px;padding:10px;box-shadow:0 2px 8px rgba(0,0,0,.08);text-decoration:none;color:inherit}
+.card img,.doc img{width:100%;border-radius:10px;display:block}.card h3{font-size:.95rem;margin:8px 0 4px}
+.meta{font-size:.8rem;color:#555}.doc{max-width:520px;margin:0 auto;background:#fff;border-radius:16px;padding:16px;box-shadow:0 2px 10px rgba(0,0,0,.1)}
+.btn{display:block;text-align:center;background:#1B5E20;color:#fff;padding:14px;border-radius:12px;text-decoration:none;font-weight:700;margin-top:12px}
+.count{margin:0 0 10px;font-size:.9rem;color:#333}
+"""
+
+# Imbasan QR (?doc=<id>) terus ke halaman dokumen, sebelum indeks dimuat
+REDIRECT_JS = "var m=/[?&#]doc=(\\d+)/.exec(location.search+location.hash);if(m){location.replace('doc/'+m[1]+'.html');}"
+
+INDEX_JS = """
+var C=window.FAMA_CATALOG||{docs:[]},S=window.FAMA_SEARCH||{tokens:{}};
+var byId={},keys=Object.keys(S.tokens);C.docs.forEach(function(d){byId[d.id]=d;});
+function norm(s){return (s||'').toLowerCase().normalize('NFKD').replace(/[\\u0300-\\u036f]/g,'');}
+function match(term){var out={};keys.forEach(function(k){if(k.lastIndexOf(term,0)===0){S.tokens[k].forEach(function(i){out[i]=1;});}});return out;}
+function esc(s){return String(s==null?'':s).replace(/[&<>"']/g,function(c){return '&#'+c.charCodeAt(0)+';';});}
+function card(d){var t=d.thumb;return '<a class="card" href="doc/'+d.id+'.html">'+(t?'<picture><source type="image/webp" srcset="'+t.webp+'"><img loading="lazy" alt="" src="'+t.jpg+'"></picture>':'')+
+'<h3>'+esc(d.title)+'</h3><div class="meta">'+esc(d.category)+' &middot; ID '+d.id+'</div></a>';}
+function render(){var q=norm(document.getElementById('q').value).match(/[a-z0-9]+/g)||[],cat=document.getElementById('cat').value,ids=null;
+q.forEach(function(t){var hit=match(t),next={};Object.keys(hit).forEach(function(i){if(!ids||ids[i]){next[i]=1;}});ids=next;});
+var docs=ids?Object.keys(ids).map(function(i){return byId[i];}).filter(Boolean):C.docs.slice();
+if(cat){docs=docs.filter(function(d){return d.category===cat;});}
+docs.sort(function(a,b){return b.id-a.id;});
+document.getElementById('n').textContent=docs.length+' standard';
+document.getElementById('list').innerHTML=docs.slice(0,300).map(card).join('');}
+var sel=document.getElementById('cat');(C.categories||[]).forEach(function(c){var o=document.createElement('option');o.value=o.textContent=c;sel.appendChild(o);});
+document.getElementById('q').addEventListener('input',render);sel.addEventListener('change',render);render();
+"""
+
+
+def _page(title, body, scripts=(), inline=""):
+    tags = "".join(f'<script src="{s}"></script>' for s in scripts) + (f"<script>{inline}</script>" if inline else "")
+    return ("<!doctype html><html lang='ms'><head><meta charset='utf-8'>"
+            "<meta name='viewport' content='width=device-width,initial-scale=1'>"
+            f"<title>{html.escape(title)}</title><style>{CSS}</style></head><body>"
+            "<header><h1>Rujukan Standard FAMA</h1><p>Katalog luar talian</p></header>"
+            f"<main>{body}</main>{tags}</body></html>")
+
+
+def _picture(thumb, root=""):
+    if not thumb:
+        return ""
+    srcset = lambda ext: ", ".join(f"{root}{thumb[ext][w]} {w}w" for w in thumbs.SIZES)
+    return (f"<picture><source type='image/webp' srcset='{srcset('webp')}' sizes='(max-width:560px) 90vw, 400px'>"
+            f"<img alt='' src='{root}{thumb['jpg'][thumbs.SIZES[-1]]}' srcset='{srcset('jpg')}' "
+            "sizes='(max-width:560px) 90vw, 400px'></picture>")
+
+
+def render_doc(d):
+    pdf = (f"<a class='btn' href='../{d['pdf']}' download='{html.escape(d['file_name'] or 'standard.pdf')}'>BUKA PDF</a>"
+           if d.get("pdf") else "<p class='meta'>PDF tidak disertakan dalam eksport ini.</p>")
+    body = (f"<p><a href='../index.html'>&larr; Semua standard</a></p><div class='doc'>"
+            f"{_picture(d['thumb'], '../')}<h2>{html.escape(d['title'] or '')}</h2>"
+            f"<p class='meta'>{html.escape(d['category'] or '')} &middot; ID {d['id']} &middot; "
+            f"{html.escape((d['upload_date'] or '')[:10])}</p>{pdf}</div>")
+    return _page(d["title"] or f"Standard {d['id']}", body)
+
+
+def render_index():
+    body = (f"<script>{REDIRECT_JS}</script><div class='bar'><input id='q' type='search' placeholder='Cari standard...' autocomplete='off'>"
+            "<select id='cat'><option value=''>Semua kategori</option></select></div>"
+            "<p class='count' id='n'></p><div class='grid' id='list'></div>")
+    return _page("Rujukan Standard FAMA", body, ("catalog.js", "search.js"), INDEX_JS)
+
+
+# =============================================
+# EKSPORT
+# =============================================
+def _thumb(site, doc, keep):
+    """Salin varian thumbnail; pulangkan {ext: {lebar: laluan relatif}}."""
+    try:
+        variants = thumbs.ensure_variants(doc["thumbnail_path"]) or thumbs.placeholder()
+    except Exception:
+        return None
+    out = {}
+    for (w, ext), src in variants.items():
+        if not os.path.exists(src):
+            return None
+        name = os.path.basename(src)
+        site.copy(src, f"thumbs/{name}")
+        keep.add(name)
+        out.setdefault(ext, {})[w] = f"thumbs/{name}"
+    return out
+
+
+def _pdf(site, doc, keep):
+    """Salin PDF sebagai pdf/<sha256>.pdf; pulangkan laluan relatif atau None."""
+    src = doc["file_path"]
+    if not src or not os.path.exists(src):
+        return None
+    sha = doc["sha256"] or site.file_sha(src)
+    name = f"{sha}.pdf"
+    site.copy(src, f"pdf/{name}")
+    keep.add(name)
+    return f"pdf/{name}"
+
+
+def _doc_hash(doc, thumb, pdf):
+    key = {k: doc[k] for k in FIELDS} | {"thumb": thumb, "pdf": pdf, "v": RENDER_VERSION}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _page_tokens():
+    by_doc = defaultdict(set)
+    for r in db.query("SELECT doc_id, body FROM page_text"):
+        by_doc[r["doc_id"]] |= tokens(r["body"])
+    return by_doc
+
+
+@metrics.timed("offline.export")
+def export(out_dir=OUT_DIR, with_text=False, with_pdf=True, force=False, log=None, progress=None):
+    """Jana/kemas kini laman statik; pulangkan {docs, rendered, removed, files, pruned, brotli}.
+
+    progress(siap, jumlah) dan log(teks) pilihan.
+    """
+    site = Site(out_dir, force)
+    docs = db.query(f"SELECT {', '.join(FIELDS)}, file_path, thumbnail_path FROM documents ORDER BY id")
+    text = _page_tokens() if with_text else {}
+    keep_thumbs, keep_pdfs = set(), set()
+    index, search, seen, rendered = [], defaultdict(set), set(), 0
+
+    for n, doc in enumerate(docs, 1):
+        if progress:
+            progress(n, len(docs))
+        thumb = _thumb(site, doc, keep_thumbs)
+        pdf = _pdf(site, doc, keep_pdfs) if with_pdf else None
+        entry = {k: doc[k] for k in FIELDS} | {"thumb": thumb, "pdf": pdf}
+        key, digest = str(doc["id"]), _doc_hash(doc, thumb, pdf)
+        seen.add(key)
+        if site.docs.get(key) != digest or not os.path.exists(site.path(f"doc/{key}.html")):
+            site.write(f"doc/{key}.html", render_doc(entry))
+            site.docs[key] = digest
+            rendered += 1
+            if log:
+                log(f"ID {key}: dijana")
+        index.append({"id": doc["id"], "title": doc["title"], "category": doc["category"],
+                      "date": (doc["upload_date"] or "")[:10], "sha256": doc["sha256"], "pdf": pdf,
+                      "thumb": {ext: v[thumbs.SIZES[1]] for ext, v in thumb.items()} if thumb else None})
+        for t in tokens(f"{doc['title']} {doc['category']}") | {key} | text.get(doc["id"], set()):
+            search[t].add(doc["id"])
+
+    removed = sorted(set(site.docs) - seen, key=int)
+    for key in removed:
+        site.remove(f"doc/{key}.html")
+        del site.docs[key]
+        if log:
+            log(f"ID {key}: dibuang")
+
+    catalog_data = {"docs": index, "categories": sorted({d["category"] for d in index if d["category"]})}
+    search_data = {"tokens": {t: sorted(ids) for t, ids in sorted(search.items())}}
+    compact = lambda o: json.dumps(o, ensure_ascii=False, separators=(",", ":"))
+    site.write("index.json", compact(catalog_data))
+    site.write("catalog.js", f"window.FAMA_CATALOG={compact(catalog_data)};")
+    site.write("search.js", f"window.FAMA_SEARCH={compact(search_data)};")
+    site.write("index.html", render_index())
+    pruned = site.prune("thumbs", keep_thumbs) + site.prune("pdf", keep_pdfs)
+    site.save_state()
+    return {"docs": len(docs), "rendered": rendered, "removed": len(removed),
+            "files": site.written, "pruned": pruned, "brotli": site.br is not None}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Eksport katalog FAMA Standard sebagai laman statik luar talian")
+    ap.add_argument("-o", "--output", default=OUT_DIR, help="folder output")
+    ap.add_argument("--text", action="store_true", help="masukkan teks kandungan PDF dalam indeks carian")
+    ap.add_argument("--no-pdf", action="store_true", help="tanpa PDF (katalog + thumbnail sahaja)")
+    ap.add_argument("--force", action="store_true", help="jana semula semua halaman")
+    args = ap.parse_args()
+    db.init_db()
+    r = export(args.output, args.text, not args.no_pdf, args.force, log=print)
+    print(f"{r['docs']} dokumen: {r['rendered']} dijana, {r['removed']} dibuang, "
+          f"{r['files']} fail ditulis, {r['pruned']} fail lama dipadam"
+          + ("" if r["brotli"] else " (tiada modul brotli: .gz sahaja)"), file=sys.stderr)
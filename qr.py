@@ -0,0 +1,159 @@
+"""
+QR code dokumen dengan cache.
+
+Setiap QR dijana sekali sahaja: PNG disimpan di qrcodes/ dengan nama fail
+sha256 (pautan + warna + saiz), dan bait PNG disimpan dalam cache LRU
+memori. Carian berulang di "Papar QR Code" tidak lagi mengekod semula.
+Cetakan pukal (PDF / ZIP) guna cache yang sama.
+
+qrcode dan Pillow diimport hanya semasa mengekod atau menyusun helaian,
+jadi memuatkan modul ini (doc_link, PNG dari cakera) kekal ringan.
+"""
+import hashlib
+import os
+import secrets
+import zipfile
+import zlib
+from functools import lru_cache
+from io import BytesIO
+
+import metrics
+import thumbs
+
+BASE_URL = os.environ.get("FAMA_BASE_URL", "https://rujukan-fama-standard.streamlit.app")
+QR_DIR = "qrcodes"
+FILL = "#1B5E20"
+BACK = "white"
+BOX_SIZE = 10
+BORDER = 4
+
+
+def doc_link(doc_id, base_url=BASE_URL):
+    return f"{base_url.rstrip('/')}/?doc={doc_id}"
+
+
+def cache_key(doc_id, base_url=BASE_URL, fill=FILL, back=BACK):
+    raw = f"{doc_link(doc_id, base_url)}|{fill}|{back}|{BOX_SIZE}|{BORDER}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+@metrics.timed("qr.encode")
+def _encode(link, fill, back):
+    import qrcode
+    qr = qrcode.QRCode(box_size=BOX_SIZE, border=BORDER)
+    qr.add_data(link)
+    qr.make(fit=True)
+    buf = BytesIO()
+    qr.make_image(fill_color=fill, back_color=back).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=512)
+def qr_png(doc_id, base_url=BASE_URL, fill=FILL, back=BACK):
+    """Bait PNG QR untuk dokumen (memori -> cakera -> jana)."""
+    path = os.path.join(QR_DIR, cache_key(doc_id, base_url, fill, back) + ".png")
+    if os.path.exists(path):
+        metrics.count("qr.disk_hit")
+        with open(path, "rb") as f:
+            return f.read()
+    metrics.count("qr.disk_miss")
+    data = _encode(doc_link(doc_id, base_url), fill, back)
+    os.makedirs(QR_DIR, exist_ok=True)
+    # Akhiran rawak: sesi/kerja lain dalam proses yang sama mungkin menjana QR yang sama serentak
+    tmp = f"{path}.{os.getpid()}.{secrets.token_hex(4)}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return data
+
+
+def safe_name(text, limit=40):
+    keep = "".join(ch if ch.isalnum() or ch in " -_" else "_" for ch in text)
+    return keep.strip()[:limit] or "dokumen"
+
+
+# =============================================
+# CETAKAN PUKAL
+# =============================================
+def qr_zip(docs):
+    """ZIP berisi satu PNG setiap dokumen. PNG sudah termampat -> ZIP_STORED."""
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as z:
+        for d in docs:
+            z.writestr(f"QR_{d['id']}_{safe_name(d['title'])}.png", qr_png(d['id']))
+    return buf.getvalue()
+
+
+def _sheet_pages(docs, cols, rows, dpi):
+    """Jana halaman helaian satu demi satu (mod "1": hitam-putih, 1 bit/piksel dalam PDF)."""
+    from PIL import Image, ImageDraw
+    page_w, page_h = int(8.27 * dpi), int(11.69 * dpi)
+    margin = int(0.4 * dpi)
+    cell_w = (page_w - 2 * margin) // cols
+    cell_h = (page_h - 2 * margin) // rows
+    qr_side = min(cell_w, cell_h) - int(0.45 * dpi)
+    font = thumbs.load_font(max(12, dpi // 7))
+
+    per_page = cols * rows
+    for start in range(0, len(docs), per_page):
+        page = Image.new("1", (page_w, page_h), 1)
+        draw = ImageDraw.Draw(page)
+        for i, d in enumerate(docs[start:start + per_page]):
+            x = margin + (i % cols) * cell_w
+            y = margin + (i // cols) * cell_h
+            with Image.open(BytesIO(qr_png(d['id']))) as src:
+                img = src.convert("L").point(lambda v: 255 if v >= 128 else 0, "1").resize((qr_side, qr_side), Image.NEAREST)
+            page.paste(img, (x + (cell_w - qr_side) // 2, y))
+            caption = f"{d['title'][:32]}\nID {d['id']} - {d['category']}"
+            draw.multiline_text((x + cell_w // 2, y + qr_side + 6), caption, fill=0,
+                                font=font, anchor="ma", align="center")
+        yield page
+
+
+def _write_pdf(pages, dpi):
+    """PDF minimum: satu imej 1-bit (Flate) setiap halaman, ditulis sebaik halaman siap.
+
+    Pillow menyimpan semua halaman dalam memori sehingga save_all selesai;
+    di sini hanya satu halaman mentah pada satu masa + bait termampat.
+    """
+    buf = BytesIO()
+    buf.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets, kids, nxt = {}, [], [3]  # 1 = katalog, 2 = pokok halaman (ditulis di akhir)
+
+    def put(body, n=None):
+        if n is None:
+            n, nxt[0] = nxt[0], nxt[0] + 1
+        offsets[n] = buf.tell()
+        buf.write(b"%d 0 obj\n%s\nendobj\n" % (n, body))
+        return n
+
+    def stream(meta, data):
+        return b"<< %s /Length %d >>\nstream\n%s\nendstream" % (meta, len(data), data)
+
+    for page in pages:
+        w, h = page.size
+        pw, ph = w * 72 / dpi, h * 72 / dpi
+        img = put(stream(b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                         b"/BitsPerComponent 1 /Filter /FlateDecode" % (w, h), zlib.compress(page.tobytes(), 6)))
+        content = put(stream(b"", b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (pw, ph)))
+        kids.append(put(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+                        b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>" % (pw, ph, img, content)))
+    if not kids:
+        return b""
+    put(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)), 2)
+    put(b"<< /Type /Catalog /Pages 2 0 R >>", 1)
+    xref, size = buf.tell(), max(offsets) + 1
+    buf.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+    buf.write(b"".join(b"%010d 00000 n \n" % offsets[n] for n in range(1, size)))
+    buf.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref))
+    return buf.getvalue()
+
+
+@metrics.timed("qr.sheet_pdf")
+def qr_sheet_pdf(docs, cols=3, rows=4, dpi=150):
+    """Helaian A4 sedia cetak: grid QR dengan tajuk dan ID di bawah setiap kod.
+
+    Halaman dijana dan dimampat satu demi satu, jadi memori puncak tidak
+    bergantung pada bilangan standard dalam kategori.
+    """
+    return _write_pdf(_sheet_pages(docs, cols, rows, dpi), dpi)
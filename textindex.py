@@ -0,0 +1,94 @@
+"""
+Indeks teks kandungan PDF.
+
+Teks setiap muka surat diekstrak sekali (PyMuPDF) dan disimpan dalam
+page_text; SQLite mengekalkan indeks FTS5 page_text_fts melalui trigger,
+jadi carian "dalam kandungan" hanya satu MATCH berindeks, bukan membuka
+PDF setiap kali. doc_text merekod sha256 yang telah diindeks: dokumen yang
+fail-nya tidak berubah dilangkau semasa backfill.
+
+Upload baru diindeks oleh jobs.process_upload. Dokumen lama:
+    python textindex.py backfill           # hanya yang belum / berubah
+    python textindex.py backfill --force   # indeks semula semua
+Pengekstrakan berjalan selari (proses); penulisan DB oleh satu penulis.
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import db
+
+WORKERS = int(os.environ.get("FAMA_WORKERS", "4"))
+
+
+def available():
+    try:
+        import pymupdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def extract_pages(pdf_path):
+    """[(no_muka_surat, teks), ...] bermula dari 1.
+
+    None jika PyMuPDF tiada - pemanggil tidak boleh merekod dokumen sebagai
+    sudah diindeks, supaya backfill mencubanya semula selepas PyMuPDF dipasang.
+    """
+    try:
+        import pymupdf
+    except ImportError:
+        return None
+    with pymupdf.open(pdf_path) as pdf:
+        return [(i + 1, page.get_text("text")) for i, page in enumerate(pdf)]
+
+
+def index_doc(doc_id, pdf_path, sha256=None):
+    """Ekstrak dan simpan teks satu dokumen; pulangkan bilangan muka surat (None jika tiada pengekstrak)."""
+    pages = extract_pages(pdf_path)
+    if pages is None:
+        return None
+    db.set_doc_text(doc_id, sha256, pages)
+    return len(pages)
+
+
+def pending(force=False):
+    """Dokumen yang teksnya belum diindeks atau fail-nya telah berubah."""
+    done = {} if force else db.text_status()
+    return [d for d in db.query("SELECT id, file_path, sha256 FROM documents ORDER BY id")
+            if d["id"] not in done or done[d["id"]] != d["sha256"]]
+
+
+def _extract(doc):
+    try:
+        return doc, extract_pages(doc["file_path"]), None
+    except Exception as e:
+        return doc, None, str(e)
+
+
+def backfill(force=False, log=print, workers=WORKERS):
+    todo = [d for d in pending(force) if d["file_path"] and os.path.exists(d["file_path"])]
+    if not available():
+        log(f"PyMuPDF tiada: {len(todo)} dokumen belum boleh diindeks (pip install pymupdf)")
+        return {"indexed": 0, "failed": len(todo)}
+    ok = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for doc, pages, err in pool.map(_extract, todo, chunksize=4):
+            if err is not None:
+                failed += 1
+                log(f"ID {doc['id']}: gagal ({err})")
+                continue
+            db.set_doc_text(doc["id"], doc["sha256"], pages)
+            ok += 1
+            log(f"ID {doc['id']}: {len(pages)} muka surat")
+    log(f"Diindeks: {ok}, gagal: {failed}")
+    return {"indexed": ok, "failed": failed}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print(__doc__)
+        sys.exit(2)
+    db.init_db()
+    result = backfill(force="--force" in sys.argv[2:])
+    sys.exit(1 if result["failed"] else 0)
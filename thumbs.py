@@ -0,0 +1,130 @@
+"""
+Thumbnail berbilang saiz.
+
+Setiap thumbnail disimpan dalam beberapa lebar (SIZES) sebagai WebP dan JPEG
+di bawah static/thumbs/, supaya halaman boleh guna <picture>/srcset dan
+pelayar ambil saiz terkecil yang muat (telefon ~120-240px, bukan 400x600
+penuh). thumbnail_path dalam DB menunjuk kepada JPEG terbesar.
+
+Tiada thumbnail -> jana dari muka surat pertama PDF (PyMuPDF, jika ada).
+Tiada langsung -> placeholder tempatan, bukan via.placeholder.com.
+
+Pillow diimport hanya bila imej perlu dijana; memaparkan varian sedia ada
+(kes biasa setiap rerun) cuma semakan fail.
+"""
+import os
+import secrets
+from datetime import datetime
+
+import metrics
+
+THUMB_DIR = os.path.join("static", "thumbs")
+SIZES = (120, 240, 400)
+FORMATS = (("webp", "WEBP", {"quality": 80, "method": 6}),
+           ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}))
+ASPECT = 1.5  # tinggi = 1.5 x lebar (400x600 asal)
+
+
+def _stem(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    suffix = f"_{SIZES[-1]}"
+    return stem[:-len(suffix)] if stem.endswith(suffix) else stem
+
+
+def variant_path(thumbnail_path, width, ext):
+    return os.path.join(THUMB_DIR, f"{_stem(thumbnail_path)}_{width}.{ext}")
+
+
+def _write_variants(img, stem):
+    from PIL import Image
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    img = img.convert("RGB")
+    for w in SIZES:
+        v = img.copy()
+        v.thumbnail((w, int(w * ASPECT)), Image.LANCZOS)
+        for ext, fmt, opts in FORMATS:
+            v.save(os.path.join(THUMB_DIR, f"{stem}_{w}.{ext}"), fmt, **opts)
+    return os.path.join(THUMB_DIR, f"{stem}_{SIZES[-1]}.jpg")
+
+
+def new_stem():
+    # Akhiran rawak: import pukal menjana thumbnail serentak dalam beberapa proses
+    return f"thumb_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{secrets.token_hex(3)}"
+
+
+@metrics.timed("thumbs.save_thumbnail")
+def save_thumbnail(file):
+    """Simpan imej yang dimuat naik dalam semua saiz; pulangkan laluan JPEG terbesar."""
+    from PIL import Image
+    return _write_variants(Image.open(file), new_stem())
+
+
+@metrics.timed("thumbs.pdf_thumbnail")
+def pdf_thumbnail(pdf_path):
+    """Thumbnail dari muka surat pertama PDF. None jika PyMuPDF tiada atau PDF rosak."""
+    try:
+        import pymupdf
+    except ImportError:
+        return None
+    from PIL import Image
+    with pymupdf.open(pdf_path) as pdf:
+        if pdf.page_count == 0:
+            return None
+        page = pdf[0]
+        zoom = SIZES[-1] / max(page.rect.width, 1)
+        pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    return _write_variants(img, new_stem())
+
+
+def ensure_variants(thumbnail_path):
+    """Pastikan semua saiz wujud (thumbnail lama di thumbnails/ dijana sekali).
+
+    Pulangkan {(lebar, ext): laluan}, atau None jika tiada imej sumber.
+    """
+    if not thumbnail_path:
+        return None
+    out = {(w, ext): variant_path(thumbnail_path, w, ext) for w in SIZES for ext, _, _ in FORMATS}
+    if os.path.exists(out[(SIZES[-1], "webp")]):
+        metrics.count("thumbs.variant_hit")
+        return out
+    if not os.path.exists(thumbnail_path):
+        return None
+    from PIL import Image
+    metrics.count("thumbs.variant_miss")
+    with metrics.timer("thumbs.generate_variants"), Image.open(thumbnail_path) as img:
+        _write_variants(img, _stem(thumbnail_path))
+    return out
+
+
+def remove(thumbnail_path):
+    """Padam thumbnail asal dan semua variannya."""
+    if not thumbnail_path:
+        return
+    paths = {thumbnail_path} | {variant_path(thumbnail_path, w, ext) for w in SIZES for ext, _, _ in FORMATS}
+    for p in paths:
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def load_font(size):
+    """Fon lalai Pillow pada saiz tertentu (juga digunakan qr.py)."""
+    from PIL import ImageFont
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def placeholder():
+    """Placeholder tempatan (semua saiz), dijana sekali."""
+    out = {(w, ext): os.path.join(THUMB_DIR, f"placeholder_{w}.{ext}") for w in SIZES for ext, _, _ in FORMATS}
+    if os.path.exists(out[(SIZES[-1], "webp")]):
+        return out
+    from PIL import Image, ImageDraw
+    w, h = SIZES[-1], int(SIZES[-1] * ASPECT)
+    img = Image.new("RGB", (w, h), "#4CAF50")
+    draw = ImageDraw.Draw(img)
+    draw.text((w // 2, h // 2), "FAMA", fill="white", font=load_font(72), anchor="mm")
+    _write_variants(img, "placeholder")
+    return out